@@ -0,0 +1,143 @@
+"""
+@file assetpack.py
+@brief Pre-decoded PCM asset pack for the Retinal game's sounds.
+@details The build step decodes every note sample and sound effect once into
+         one file of raw PCM in the mixer format (MIXER_FREQUENCY, MIXER_SIZE,
+         MIXER_CHANNELS). At runtime the pack is memory-mapped and each Sound
+         is built from a memoryview slice of the map, so no decoder runs and
+         Python copies nothing (pygame itself copies the samples once into
+         the Sound). Every entry remembers its source file's size, mtime and
+         SHA-1; an entry whose source changed is ignored and that sound is
+         decoded from the source as before, until the pack is rebuilt.
+         Usage: python assetpack.py [--folder sound] [--out sound/sounds.pcmpack]
+
+File layout (little-endian)
+===========================
+header : b"RPCK" | u8 version | u32 frequency | i8 sample bits (negative = signed) | u8 channels
+         | u64 index offset | u32 index length
+data   : raw PCM blobs at DATA_ALIGN-aligned absolute offsets
+index  : JSON {name: {"offset", "length", "file", "size", "mtime_ns", "sha1"}}
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import pygame
+from config import *
+
+MAGIC = b"RPCK"; VERSION = 1; DATA_ALIGN = 64
+_HEADER = struct.Struct("<4sBIbBQI")
+EFFECT_FILES = ("hight.mp3",)   # decoded effects; music is streamed and never packed
+
+
+def _sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sources(folder: str, effects=EFFECT_FILES) -> dict:
+    """{sound name: source path} for every note sample and listed effect in folder."""
+    if not os.path.exists(folder): return {}
+    files = [f for f in os.listdir(folder) if f.endswith(".ogg")] + [f for f in effects if os.path.exists(os.path.join(folder, f))]
+    return {os.path.splitext(f)[0]: os.path.join(folder, f) for f in sorted(files)}
+
+
+class AssetPack:
+    """
+    @class AssetPack
+    @brief Read-only, memory-mapped view of a built pack.
+    @details open() returns None when the pack is missing, unreadable or built
+             for another mixer format; stale entries are dropped one by one.
+             The map stays open for the life of the pack.
+    """
+    def __init__(self, path: str, mapped: mmap.mmap, entries: dict):
+        self.path = path; self._map = mapped; self._view = memoryview(mapped); self._entries = entries
+
+    @classmethod
+    def open(cls, path: str = PACK_FILE, folder: str = SOUND_FOLDER, mixer_format=None) -> "AssetPack":
+        mixer_format = mixer_format or pygame.mixer.get_init()
+        if not mixer_format or not os.path.exists(path): return None
+        mapped = None
+        try:
+            with open(path, "rb") as f: mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, frequency, size, channels, index_offset, n = _HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != VERSION: raise ValueError(f"not a version {VERSION} pack")
+            if (frequency, size, channels) != tuple(mixer_format): mapped.close(); return None
+            index = json.loads(mapped[index_offset:index_offset + n])
+        except (OSError, ValueError, struct.error) as e:
+            if mapped is not None: mapped.close()
+            logging.warning(f"Asset pack {path} unreadable: {e}"); return None
+        entries = {name: entry for name, entry in index.items() if cls._fresh(entry, folder)}
+        if len(entries) < len(index): logging.info(f"Asset pack {path}: {len(index) - len(entries)} stale entries, rebuild with assetpack.py")
+        return cls(path, mapped, entries)
+
+    @staticmethod
+    def _fresh(entry: dict, folder: str) -> bool:
+        # Size + mtime is the fast path; a touched but identical file is confirmed by its hash
+        source = os.path.join(folder, entry["file"])
+        try: st = os.stat(source)
+        except OSError: return False
+        if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]: return True
+        return st.st_size == entry["size"] and _sha1(source) == entry["sha1"]
+
+    def __contains__(self, name: str): return name in self._entries
+    def __len__(self): return len(self._entries)
+
+    def raw(self, name: str) -> memoryview:
+        """Zero-copy slice of the mapped PCM for name."""
+        entry = self._entries[name]; return self._view[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def sound(self, name: str) -> pygame.mixer.Sound: return pygame.mixer.Sound(buffer=self.raw(name))
+
+    def close(self) -> None:
+        self._view.release(); self._map.close()
+
+
+def build_pack(folder: str = SOUND_FOLDER, path: str = PACK_FILE, effects=EFFECT_FILES) -> dict:
+    """
+    @brief Decodes every source into a new pack; entries still fresh in the old pack are copied, not decoded.
+    @details Needs the mixer initialised in the game's format. Written to a temp
+             file and renamed, so a running game keeps its old mapping valid.
+    @return {"decoded": n, "reused": n, "bytes": total PCM bytes}
+    """
+    mixer_format = pygame.mixer.get_init()
+    old = AssetPack.open(path, folder, mixer_format)
+    index = {}; stats = {"decoded": 0, "reused": 0, "bytes": 0}; tmp = f"{path}.tmp"; pcm = None
+    try:
+        with open(tmp, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            for name, source in _sources(folder, effects).items():
+                st = os.stat(source)
+                if old is not None and name in old and old._entries[name]["file"] == os.path.basename(source):
+                    pcm = old.raw(name); stats["reused"] += 1
+                else:
+                    pcm = pygame.mixer.Sound(source).get_raw(); stats["decoded"] += 1
+                f.write(b"\0" * (-f.tell() % DATA_ALIGN)); offset = f.tell(); f.write(pcm); stats["bytes"] += len(pcm)
+                index[name] = {"offset": offset, "length": len(pcm), "file": os.path.basename(source), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": _sha1(source)}
+                del pcm
+            meta = json.dumps(index, separators=(",", ":")).encode(); index_offset = f.tell(); f.write(meta)
+            f.seek(0); f.write(_HEADER.pack(MAGIC, VERSION, *mixer_format, index_offset, len(meta)))
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        pcm = None   # a slice of the old map would keep it from closing
+        if old is not None: old.close()
+        if os.path.exists(tmp): os.remove(tmp)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse, time
+    parser = argparse.ArgumentParser(description="Build the Retinal PCM asset pack")
+    parser.add_argument("--folder", default=SOUND_FOLDER)
+    parser.add_argument("--out", default=PACK_FILE)
+    args = parser.parse_args()
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.pre_init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER); pygame.mixer.init()
+    start = time.perf_counter(); stats = build_pack(args.folder, args.out)
+    print(f"{args.out}: {stats['decoded']} decoded, {stats['reused']} reused, {stats['bytes'] / 2**20:.1f} MB PCM in {time.perf_counter() - start:.2f}s")
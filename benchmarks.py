@@ -0,0 +1,344 @@
+"""
+@file benchmarks.py
+@brief Performance benchmarks for the Retinal game.
+@details Runs headless under the SDL dummy video driver. Two parts:
+         1. Comparisons: each optimized hot path against the code it replaced.
+         2. Micro-benchmark suite: every registered case at several entity
+            counts, with warm-up and repetition control and JSON output so
+            runs can be compared across commits.
+         Usage: python benchmarks.py [--filter SUBSTR] [--warmup N] [--repeat N] [--number N] [--json FILE]
+                python benchmarks.py --compare
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+
+import argparse
+import itertools
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import numpy as np
+import pygame
+from config import *
+
+pygame.init()
+
+
+# =============================================================================
+# 1. COMPARISONS
+# =============================================================================
+
+
+def _time_frames(draw_frame, frames: int) -> float:
+    """Returns the mean cost of one draw_frame(i) call in milliseconds."""
+    draw_frame(0)
+    start = time.perf_counter()
+    for i in range(frames): draw_frame(i)
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def bench_waves(frames: int = 300) -> float:
+    """Per-frame cost of the dark theme waves: polygon rasterization vs strip blit."""
+    from engine import theme_mgr
+    from render import WaveStrip
+    target = pygame.Surface((WIDTH, HEIGHT))
+    waves = [w for w in theme_mgr.themes["dark"]["bg_elements"] if w["type"] == "wave"]
+
+    scratch = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    def legacy_frame(i):
+        for w in waves:
+            phase = i * w["speed"] / FPS
+            scratch.fill((0, 0, 0, 0))
+            points = [(x, w["amp"] * math.sin(w["freq"] * x + phase) + w["y"]) for x in range(WIDTH + 1)]
+            points.extend([(WIDTH, HEIGHT), (0, HEIGHT)])
+            pygame.draw.polygon(scratch, w["color"], points)
+            target.blit(scratch, (0, 0))
+
+    strips = [(WaveStrip(w["color"], w["amp"], w["freq"], w["y"]), w["speed"]) for w in waves]
+    def strip_frame(i):
+        for strip, speed in strips: strip.draw(target, i * speed / FPS)
+
+    before = _time_frames(legacy_frame, frames); after = _time_frames(strip_frame, frames)
+    print(f"waves x{len(waves)}: polygon {before:.3f} ms/frame, strip {after:.3f} ms/frame ({before / after:.1f}x)")
+    return after
+
+
+def bench_clouds(frames: int = 300) -> float:
+    """Per-frame cost of the light theme clouds: per-frame surfaces vs atlas blits."""
+    from engine import theme_mgr
+    from render import CloudAtlas
+    target = pygame.Surface((WIDTH, HEIGHT))
+    clouds = [c for c in theme_mgr.themes["light"]["bg_elements"] if c["type"] == "cloud"]
+
+    def legacy_frame(i):
+        for c in clouds:
+            current_radius = c["size"] + math.sin(i * c["speed"] / FPS) * 3; surf_size = int(current_radius * 3)
+            cloud_surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA); center = (surf_size // 2, surf_size // 2)
+            pygame.draw.circle(cloud_surf, (255, 255, 255, int(c["alpha"] * 0.4)), center, int(current_radius * 1.5))
+            pygame.draw.circle(cloud_surf, (255, 255, 255, c["alpha"]), center, int(current_radius * 0.7))
+            target.blit(cloud_surf, (c["x"] - surf_size // 2, c["y"] - surf_size // 2))
+
+    atlas = CloudAtlas()
+    for c in clouds: atlas.prepare(c["size"], c["alpha"])
+    def atlas_frame(i):
+        for c in clouds:
+            cloud_surf = atlas.sprite(int(round(c["size"] + math.sin(i * c["speed"] / FPS) * 3)), c["alpha"]); half = cloud_surf.get_width() // 2
+            target.blit(cloud_surf, (c["x"] - half, c["y"] - half))
+
+    before = _time_frames(legacy_frame, frames); after = _time_frames(atlas_frame, frames)
+    print(f"clouds x{len(clouds)}: surfaces {before:.3f} ms/frame, atlas {after:.3f} ms/frame ({before / after:.1f}x), {len(atlas)} sprites")
+    return after
+
+
+def bench_particles(bursts: int = 40, frames: int = 120) -> None:
+    """Per-frame cost of catch bursts: Particle objects in an ObjectManager vs ParticleSystem."""
+    import random
+    from engine import ObjectManager
+    from entities import Particle, ParticleSystem
+    target = pygame.Surface((WIDTH, HEIGHT)); dt = 1 / FPS
+
+    manager = ObjectManager[Particle]()
+    def legacy_frame(i):
+        if i % 3 == 0:
+            for _ in range(bursts // 10):
+                for _ in range(10): manager.add(Particle(random.randint(0, WIDTH), random.randint(0, HEIGHT), (255, 229, 180)))
+        for particle in manager.get_list()[:]:
+            if not particle.update(dt): manager.remove(particle)
+        manager.draw_all(target)
+
+    system = ParticleSystem()
+    def system_frame(i):
+        if i % 3 == 0:
+            for _ in range(bursts // 10): system.emit(random.randint(0, WIDTH), random.randint(0, HEIGHT), 10, (255, 229, 180))
+        system.update(dt); system.draw(target)
+
+    before = _time_frames(legacy_frame, frames); after = _time_frames(system_frame, frames)
+    print(f"particles ~{len(system)} live: objects {before:.3f} ms/frame, arrays {after:.3f} ms/frame ({before / after:.1f}x)")
+
+
+def bench_object_manager(count: int = 10000, frames: int = 60) -> None:
+    """Per-frame cost of a typed sweep with 5% churn: list copy + list.remove vs the handle-based manager."""
+    from engine import ObjectManager
+    class Note: pass
+    class Coin: pass
+    kinds = (Note, Note, Note, Coin); churn = count // 20
+
+    legacy = [kinds[i % 4]() for i in range(count)]
+    def legacy_frame(i):
+        removed = 0
+        for obj in legacy[:]:
+            if isinstance(obj, Note) and removed < churn and (id(obj) >> 4) % 20 == i % 20:
+                legacy.remove(obj); removed += 1
+        for _ in range(removed): legacy.append(Note())
+
+    manager = ObjectManager()
+    for i in range(count): manager.add(kinds[i % 4]())
+    def manager_frame(i):
+        removed = 0
+        for obj in manager.of_type(Note):
+            if removed < churn and (id(obj) >> 4) % 20 == i % 20:
+                manager.remove(obj); removed += 1
+        for _ in range(removed): manager.add(Note())
+
+    before = _time_frames(legacy_frame, frames); after = _time_frames(manager_frame, frames)
+    print(f"object manager x{count}: list {before:.3f} ms/frame, handles {after:.3f} ms/frame ({before / after:.1f}x)")
+
+
+def bench_collisions(count: int = 5000, frames: int = 120) -> None:
+    """Per-frame basket check in a stress field: colliderect per object vs band + collidelistall."""
+    import random
+    from collisions import CollisionSweep
+    class Falling:
+        __slots__ = ("_x", "_y")
+        def __init__(self): self._x = random.randint(100, WIDTH - 100); self._y = random.uniform(-200, HEIGHT)
+        def get_y(self): return self._y
+        def get_rect(self): return pygame.Rect(self._x - 10, self._y - 10, 20, 20)
+    objects = [Falling() for _ in range(count)]; basket = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 80, 150, 20)
+
+    def legacy_frame(i):
+        hits = missed = 0
+        for obj in objects:
+            if obj.get_y() > HEIGHT: missed += 1
+            elif obj.get_rect().colliderect(basket): hits += 1
+        return hits, missed
+
+    sweep = CollisionSweep()
+    def sweep_frame(i): return sweep.sweep(objects, basket)
+
+    before = _time_frames(legacy_frame, frames); after = _time_frames(sweep_frame, frames)
+    print(f"collisions x{count}: per-object {before:.3f} ms/frame, band sweep {after:.3f} ms/frame ({before / after:.1f}x)")
+
+
+# =============================================================================
+# 2. MICRO-BENCHMARK SUITE
+# A case is a setup(n, **variant) function returning the operation to time.
+# @bench_case registers it for every count and every variant combination.
+# =============================================================================
+CASES = []
+
+def bench_case(name: str, counts, **variants):
+    def register(setup):
+        for n, combo in itertools.product(counts, itertools.product(*variants.values())):
+            CASES.append((name, n, dict(zip(variants, combo)), setup))
+        return setup
+    return register
+
+
+class _BenchGame:
+    """Just enough of Game for entity constructors and build_render_context."""
+    def __init__(self, shape="Star"): self._equipped = {"color": "Default", "shape": shape, "size": 0}
+    def get_equipped(self, category): return self._equipped.get(category)
+
+def _use_theme(theme: str):
+    from engine import theme_mgr
+    from events import event_bus
+    if theme_mgr.current_theme != theme: theme_mgr.current_theme = theme; event_bus.notify("theme_switched", {"theme": theme})
+
+def _stars(n: int, theme: str, shape: str = "Star", rhythm: bool = False):
+    from entities import Star, build_render_context
+    _use_theme(theme); game = _BenchGame(shape); stars = []
+    for i in range(n):
+        star = Star(1.0, game, fixed_x=LANE_CENTERS[i % len(LANE_CENTERS)] if rhythm else None); star.set_y((i * 37) % HEIGHT)
+        for _ in range(15 if rhythm else 1): star.update(1 / FPS, speed=5.0)
+        stars.append(star)
+    return stars, build_render_context(game)
+
+
+@bench_case("draw_text", counts=(1, 10, 50))
+def _case_draw_text(n):
+    from engine import draw_text
+    target = pygame.Surface((WIDTH, HEIGHT)); font = pygame.font.Font(None, 30)
+    def op():
+        for i in range(n): draw_text(target, f"SCORE {i}", font, 60, 20 + i * 10, (255, 255, 255), align="topleft")
+    return op
+
+@bench_case("star.draw", counts=(10, 100, 1000), shape=("Star", "Square", "Triangle", "rhythm"), theme=("dark", "light"))
+def _case_star_draw(n, shape, theme):
+    target = pygame.Surface((WIDTH, HEIGHT)); stars, ctx = _stars(n, theme, "Star" if shape == "rhythm" else shape, shape == "rhythm")
+    def op():
+        for star in stars: star.draw(target, ctx)
+    return op
+
+@bench_case("golden_glow.draw", counts=(10, 100, 1000))
+def _case_glow_draw(n):
+    from entities import GoldenGlow
+    target = pygame.Surface((WIDTH, HEIGHT)); stars, ctx = _stars(n, "dark"); glows = [GoldenGlow(star) for star in stars]
+    def op():
+        for glow in glows: glow.update(1 / FPS); glow.draw(target, ctx)
+    return op
+
+@bench_case("procedural_wave.draw", counts=(1, 4, 16), kind=("wave", "cloud"))
+def _case_wave_draw(n, kind):
+    from engine import theme_mgr
+    from entities import ProceduralWave
+    _use_theme("dark" if kind == "wave" else "light"); target = pygame.Surface((WIDTH, HEIGHT))
+    indices = [i for i, e in enumerate(theme_mgr.get("bg_elements")) if e["type"] == kind]
+    waves = [ProceduralWave(indices[i % len(indices)]) for i in range(n)]
+    def op():
+        for wave in waves: wave.update(1 / FPS); wave.draw(target)
+    return op
+
+@bench_case("particles", counts=(100, 1000, 5000), impl=("objects", "system"))
+def _case_particles(n, impl):
+    import random
+    from entities import Particle, ParticleSystem
+    target = pygame.Surface((WIDTH, HEIGHT)); dt = 1 / FPS; color = (255, 229, 180)
+    if impl == "system":
+        system = ParticleSystem(capacity=n)
+        def op():
+            while len(system) < n: system.emit(random.randint(0, WIDTH), random.randint(0, HEIGHT), 10, color)
+            system.update(dt); system.draw(target)
+        return op
+    particles = [Particle(random.randint(0, WIDTH), random.randint(0, HEIGHT), color) for _ in range(n)]
+    def op():
+        for i, particle in enumerate(particles):
+            if not particle.update(dt): particles[i] = Particle(random.randint(0, WIDTH), random.randint(0, HEIGHT), color)
+            particle.draw(target)
+    return op
+
+@bench_case("object_manager", counts=(100, 1000, 10000), op=("add_remove", "iterate", "of_type"))
+def _case_object_manager(n, op):
+    from engine import ObjectManager
+    class Note:
+        def update(self, dt, **kwargs): pass
+    class Coin(Note): pass
+    manager = ObjectManager(); objects = [(Coin if i % 4 == 0 else Note)() for i in range(n)]
+    for obj in objects: manager.add(obj)
+    churn = objects[::20]
+    def add_remove():
+        for obj in churn: manager.remove(obj)
+        for obj in churn: manager.add(obj)
+    def iterate(): manager.update_all(1 / FPS)
+    def of_type():
+        for _ in manager.of_type(Coin): pass
+    return {"add_remove": add_remove, "iterate": iterate, "of_type": of_type}[op]
+
+@bench_case("collisions.sweep", counts=(100, 1000, 10000), source=("list", "column"))
+def _case_collisions(n, source):
+    from collisions import CollisionSweep, YColumn
+    stars, _ = _stars(n, "dark"); rng = np.random.default_rng(0)
+    for star, y in zip(stars, rng.uniform(-200, HEIGHT + 50, n)): star.set_y(float(y))
+    if source == "column":
+        column = YColumn()
+        for star in stars: column.add(star)
+        stars = column
+    sweep = CollisionSweep(); basket = pygame.Rect(WIDTH // 2 - 75, HEIGHT - 80, 150, 20)
+    return lambda: sweep.sweep(stars, basket)
+
+
+def run_case(op, warmup: int, repeat: int, number: int) -> dict:
+    """Times op: warmup untimed calls, then repeat samples of number calls each; per-call milliseconds."""
+    for _ in range(warmup): op()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number): op()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {"mean_ms": statistics.fmean(samples), "median_ms": statistics.median(samples), "min_ms": min(samples),
+            "stdev_ms": statistics.stdev(samples) if len(samples) > 1 else 0.0}
+
+
+def _environment() -> dict:
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError: commit = ""
+    return {"commit": commit, "python": platform.python_version(), "pygame": pygame.version.ver, "numpy": np.__version__,
+            "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run_suite(name_filter: str = "", warmup: int = 3, repeat: int = 7, number: int = 5, verbose: bool = True) -> dict:
+    """Runs every registered case whose name contains name_filter; returns the JSON document."""
+    results = []
+    for name, n, variant, setup in CASES:
+        if name_filter not in name: continue
+        timing = run_case(setup(n, **variant), warmup, repeat, number)
+        results.append({"name": name, "n": n, "variant": variant, **timing})
+        if verbose:
+            label = ",".join(f"{k}={v}" for k, v in variant.items())
+            print(f"{name:<22} {label:<28} n={n:<6} {timing['median_ms']:9.4f} ms  (min {timing['min_ms']:.4f}, sd {timing['stdev_ms']:.4f})")
+    return {"environment": _environment(), "settings": {"warmup": warmup, "repeat": repeat, "number": number}, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retinal micro-benchmarks")
+    parser.add_argument("--compare", action="store_true", help="run the before/after comparisons instead of the suite")
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed calls per case")
+    parser.add_argument("--repeat", type=int, default=7, help="timed samples per case")
+    parser.add_argument("--number", type=int, default=5, help="calls per sample")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    if args.compare:
+        dark = bench_waves(); light = bench_clouds()
+        print(f"background: light {light:.3f} ms/frame vs dark {dark:.3f} ms/frame")
+        bench_particles()
+        bench_object_manager()
+        bench_collisions()
+    else:
+        report = run_suite(args.filter, args.warmup, args.repeat, args.number)
+        if args.json:
+            with open(args.json, "w") as f: json.dump(report, f, indent=2)
@@ -0,0 +1,100 @@
+"""
+@file collisions.py
+@brief Batched collision checks between falling objects and the basket.
+@details Only objects whose centre lies in a thin horizontal band around the
+         basket can touch it. The band test runs over one NumPy array of y
+         coordinates; only the few objects inside it build a Rect, and the
+         narrow phase is a single Rect.collidelistall call.
+         The play states keep their falling objects in a YColumn: each object
+         writes its own slot when it moves, so a sweep makes no per-object
+         Python call and its cost grows with the band, not the field.
+"""
+
+import numpy as np
+import pygame
+from config import *
+
+
+class YColumn:
+    """
+    @class YColumn
+    @brief Slot-based NumPy column of falling objects' y, written in place by the objects.
+    @details Usually attached to an ObjectManager (attach_index), which adds
+             and removes objects as they spawn and die. add(obj) stores
+             obj.get_y() in a free slot and hands the slot over through
+             obj.bind_y(column, slot); from then on the object stores its y in
+             column.ys[slot] whenever it moves. Free slots hold -inf, which is never inside a band or past
+             the floor. Objects keep the column, not the array, so growing it
+             never leaves them writing into a stale buffer. Slots are reused,
+             so iteration order is slot order, not insertion order.
+    """
+    def __init__(self, capacity: int = 256):
+        self.ys = np.full(capacity, -np.inf); self._objs = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1)); self._slots = {}
+
+    def __len__(self): return len(self._slots)
+
+    def add(self, obj) -> None:
+        if id(obj) in self._slots: return
+        if not self._free: self._grow()
+        slot = self._free.pop(); self._objs[slot] = obj; self._slots[id(obj)] = slot
+        self.ys[slot] = obj.get_y(); obj.bind_y(self, slot)
+
+    def remove(self, obj) -> None:
+        slot = self._slots.pop(id(obj), None)
+        if slot is None: return
+        self._objs[slot] = None; self.ys[slot] = -np.inf; self._free.append(slot); obj.bind_y(None, 0)
+
+    def clear(self) -> None:
+        for obj in list(self): obj.bind_y(None, 0)
+        self.ys.fill(-np.inf); self._objs = [None] * len(self.ys); self._free = list(range(len(self.ys) - 1, -1, -1)); self._slots.clear()
+
+    def __iter__(self): return (self._objs[slot] for slot in sorted(self._slots.values()))
+
+    def objects(self, slots) -> list: return [self._objs[slot] for slot in slots]
+
+    def _grow(self):
+        n = len(self.ys); self.ys = np.concatenate([self.ys, np.full(n, -np.inf)])
+        self._objs.extend([None] * n); self._free.extend(range(2 * n - 1, n - 1, -1))
+
+
+class CollisionSweep:
+    """
+    @class CollisionSweep
+    @brief Per-frame broadphase + narrowphase against one target rect.
+    @details reach bounds the half-height of any falling hitbox (stars are at
+             most 20 px, coins 20 px), so an object whose centre is further
+             than reach from the target's top/bottom edge cannot overlap it.
+             Objects below floor are reported as missed and never as hits,
+             which matches the old per-object "if missed ... elif hit" order.
+    """
+    REACH = 32
+
+    def __init__(self, reach: int = REACH):
+        self._reach = reach
+        self._ys = np.empty(256, dtype=np.float64)
+
+    def sweep(self, objects, target: pygame.Rect, floor: float = HEIGHT) -> tuple[list, list]:
+        """
+        @brief Splits objects into (hits, missed), each in the input (for a YColumn: slot) order.
+        @param objects YColumn, or a sequence (or iterable) of objects exposing get_y() and get_rect().
+        @param target  Rect the objects are caught by, usually the basket.
+        @param floor   y below which an object counts as missed.
+        """
+        if isinstance(objects, YColumn): return self._split(objects.ys, objects.objects, target, floor)
+        objs = objects if isinstance(objects, list) else list(objects)
+        n = len(objs)
+        if not n: return [], []
+        if n > len(self._ys): self._ys = np.empty(max(n, 2 * len(self._ys)), dtype=np.float64)
+        ys = self._ys[:n]; ys[:] = [obj.get_y() for obj in objs]
+        return self._split(ys, lambda slots: [objs[i] for i in slots], target, floor)
+
+    def _split(self, ys, pick, target: pygame.Rect, floor: float) -> tuple[list, list]:
+        missed = ys > floor
+        band = np.flatnonzero((ys > target.top - self._reach) & (ys < target.bottom + self._reach) & ~missed)
+        hits = []
+        if len(band):
+            candidates = pick(band)
+            hits = [candidates[i] for i in target.collidelistall([obj.get_rect() for obj in candidates])]
+        missed = np.flatnonzero(missed)
+        return hits, pick(missed) if len(missed) else []
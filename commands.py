@@ -26,14 +26,9 @@ from abc import ABC, abstractmethod
 from typing import List, TypeVar, Generic, Optional, Dict, Any
 
 # --- LOGGING SETUP ---
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("game_log.log"),
-        logging.StreamHandler()
-    ]
-)
+# Queue-based (see gamelog.py): records are written by a background thread to a rotating log file
+from gamelog import setup_logging
+setup_logging()
 
 # --- FILE PATHS (ВИПРАВЛЕНО ПІД ВАШУ ПАПКУ) ---
 SOUND_FOLDER = "sound"            #< ВИПРАВЛЕНО: Тепер папка називається song
@@ -5,7 +5,14 @@ SOUND_FOLDER = "sound"
 FONT_FOLDER = "etc"
 HIGHSCORE_FILE = "highscore.txt"
 SAVE_FILE = "save_data.json"
+LOG_FILE = "game_log.log"
+LOG_MAX_BYTES = 1_000_000   # rotated at this size, LOG_BACKUPS old files kept
+LOG_BACKUPS = 3
+MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER = 44100, -16, 2, 512
+NOTE_BANK_BUDGET_MB = 32    # decoded note sounds kept in memory (LRU beyond this)
+AUTOSAVE_INTERVAL = 5.0   # seconds of play between session snapshots (session_save.json)
 NOTES_FILE = os.path.join(SOUND_FOLDER, "notes.json")
+PACK_FILE = os.path.join(SOUND_FOLDER, "sounds.pcmpack")   # pre-decoded PCM, built by assetpack.py
 FONT_FILE_EN = os.path.join(FONT_FOLDER, "font.otf")
 FONT_FILE_UA = os.path.join(FONT_FOLDER, "FiorinaTitle-Light.otf")
 
@@ -20,6 +27,8 @@ SONG_LIST = [
 # --- CONSTANTS ---
 WIDTH, HEIGHT = 500, 800
 FPS = 60
+TICK_RATE = 60          # simulation ticks per second, independent of the render rate
+MAX_FRAME_TIME = 0.25   # longest frame the simulation catches up on, in seconds
 MAX_PLATFORM_SPEED = 14
 NUM_BG_STARS = 200
 MAX_MISSED_STARS = 10
@@ -2,34 +2,33 @@ import pygame
 import random
 import math
 import logging
-import time
-import functools
 from abc import ABC, abstractmethod
-from typing import List, TypeVar, Generic
+from typing import List, TypeVar, Generic, Optional, Dict, Iterator
 from config import *
+import metrics
+from render import overlays
 
 # --- UTILS ---
 def clamp(value, min_val, max_val): return max(min_val, min(value, max_val))
 
+def _align_rect(rect, x, y, align):
+    if align == "center": rect.midtop = (x, y)
+    elif align == "topleft": rect.topleft = (x, y)
+    elif align == "topright": rect.topright = (x, y)
+    elif align == "left": rect.midleft = (x, y)
+    return rect
+
 def draw_text(surf, text, font, x, y, color, align="center"):
     text_surface = font.render(str(text), True, color)
-    text_rect = text_surface.get_rect()
-    if align == "center": text_rect.midtop = (x, y)
-    elif align == "topleft": text_rect.topleft = (x, y)
-    elif align == "topright": text_rect.topright = (x, y)
-    elif align == "left": text_rect.midleft = (x, y)
-    surf.blit(text_surface, text_rect)
+    return surf.blit(text_surface, _align_rect(text_surface.get_rect(), x, y, align))
+
+class KeyMap(dict):
+    """Pressed-key map where every key that was not set reads as released (stands in for pygame.key.get_pressed())."""
+    def __missing__(self, key): return False
 
 def measure_time(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.perf_counter()
-        result = func(*args, **kwargs)
-        end_time = time.perf_counter()
-        execution_time = (end_time - start_time) * 1000
-        logging.info(f"Performance: {func.__name__} took {execution_time:.4f} ms")
-        return result
-    return wrapper
+    """Aggregates the call durations into metrics histograms (summaries are logged periodically and on exit) instead of logging every call."""
+    return metrics.timed(func)
 
 # --- MANAGERS ---
 class LocalizationManager:
@@ -87,13 +86,14 @@ class ThemeManager:
                 "btn_color": (60, 40, 90), "btn_hover": (80, 60, 110), "btn_active": (100, 70, 140), "btn_text_color": (255, 255, 255),
                 "slider_line": (150, 150, 180), "slider_knob": (255, 255, 255), "modal_bg": (30, 30, 60),
                 "bg_elements": [ {"type": "wave", "color": (60, 20, 80, 100), "amp": 70, "freq": 0.012, "speed": 0.3, "y": 610}, {"type": "wave", "color": (80, 60, 140, 100), "amp": 50, "freq": 0.007, "speed": -0.45, "y": 620}, {"type": "wave", "color": (40, 40, 100, 100), "amp": 30, "freq": 0.01, "speed": 0.6, "y": 600} ],
-                "has_bg_stars": True, "star_style": "glow" 
+                "has_bg_stars": True, "star_style": "glow", "full_screen_scenery": False
             },
             "light": {
                 "bg_color": BOHO_BG, "text_color": (255, 255, 255), "platform_color": (20, 50, 100), "particle_color": None,
                 "btn_color": (20, 50, 100), "btn_hover": (40, 70, 130), "btn_active": (65, 105, 225), "btn_text_color": (255, 255, 255),
                 "slider_line": (255, 255, 255), "slider_knob": (20, 50, 100), "modal_bg": (135, 206, 250),
-                "bg_elements": self.light_clouds, "has_bg_stars": False, "star_style": "ball"
+                "bg_elements": self.light_clouds, "has_bg_stars": False, "star_style": "ball",
+                "full_screen_scenery": True   # the drifting clouds' own rects cover ~80% of the screen every frame
             }
         }
         self.light_theme_star_colors = [ (255, 105, 180), (50, 205, 50), (255, 215, 0), (255, 69, 0) ]
@@ -104,6 +104,11 @@ class ThemeManager:
         self.target_theme = "light" if self.current_theme == "dark" else "dark"
         self.is_transitioning = True
         self.transition_alpha = 0
+    def set_theme(self, theme):
+        """Switches at once, without the fade; returns True if the theme changed."""
+        changed = theme != self.current_theme
+        self.current_theme = self.target_theme = theme; self.is_transitioning = False; self.transition_alpha = 0
+        return changed
     def update(self):
         switched = False
         if self.is_transitioning:
@@ -120,11 +125,7 @@ class ThemeManager:
                     self.is_transitioning = False
         return switched
     def draw_transition(self, surface):
-        if self.is_transitioning:
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.fill(BLACK)
-            overlay.set_alpha(self.transition_alpha)
-            surface.blit(overlay, (0, 0))
+        if self.is_transitioning: overlays.draw(surface, BLACK, self.transition_alpha)
 
 theme_mgr = ThemeManager()
 
@@ -132,6 +133,7 @@ theme_mgr = ThemeManager()
 class GameObject(ABC):
     @abstractmethod
     def update(self, dt, **kwargs): pass
+    # May return the pygame.Rect it touched; dirty-rect mode presents only those areas
     @abstractmethod
     def draw(self, surface): pass
 
@@ -140,29 +142,126 @@ class UIElement(GameObject):
     def update(self, dt, **kwargs): pass
 
 class GameState(ABC):
+    interpolated = True   # False: draws a frozen simulation, so entities are drawn at their last tick (alpha 1.0)
     def __init__(self, game): self._game = game
     @abstractmethod
     def handle_event(self, event): pass
     @abstractmethod
     def update(self, dt): pass
+    # Returns the list of rects it touched, or None to force a full-screen flip
     @abstractmethod
     def draw(self, surface): pass
 
 T = TypeVar('T', bound=GameObject)
 class ObjectManager(Generic[T]):
-    def __init__(self): self._objects: List[T] = []
-    def add(self, obj: T): self._objects.append(obj)
-    def remove(self, obj: T): 
-        if obj in self._objects: self._objects.remove(obj)
-    def get_list(self) -> List[T]: return self._objects[:]
-    def clear(self): self._objects.clear()
+    """
+    Slot-based container. Every object remembers its slot in the dense list and in
+    its per-type bucket, so remove() is O(1): it leaves a hole that is compacted later,
+    in one pass, once no iteration is running. Iteration skips holes and never copies,
+    so objects can be removed (or added) while iterating.
+    An index attached for a class (attach_index) is kept in step with that class's objects.
+    """
+    COMPACT_RATIO = 4   # compact when more than 1/COMPACT_RATIO of the slots are holes
+
+    def __init__(self):
+        self._objects: List[Optional[T]] = []; self._buckets: Dict[type, List[Optional[T]]] = {}
+        self._slots: Dict[int, tuple] = {}; self._holes = 0; self._iterating = 0; self._indexes: Dict[type, object] = {}
+    def __len__(self): return len(self._slots)
+    def __iter__(self) -> Iterator[T]: return self._live(self._objects)
+    def add(self, obj: T):
+        if id(obj) in self._slots: return   # already managed: a second slot would outlive remove()
+        bucket = self._buckets.setdefault(obj.__class__, [])
+        self._slots[id(obj)] = (len(self._objects), obj.__class__, len(bucket))
+        self._objects.append(obj); bucket.append(obj)
+        index = self._indexes.get(obj.__class__)
+        if index is not None: index.add(obj)
+    def remove(self, obj: T):
+        record = self._slots.pop(id(obj), None)
+        if record is None: return
+        slot, cls, bucket_slot = record
+        self._objects[slot] = None; self._buckets[cls][bucket_slot] = None; self._holes += 1
+        index = self._indexes.get(cls)
+        if index is not None: index.remove(obj)
+        if self._holes * self.COMPACT_RATIO > len(self._objects): self._compact()
+    def attach_index(self, cls, index):
+        """Mirrors the objects of exactly class cls into index (add / remove / clear), e.g. a collisions.YColumn."""
+        self._indexes[cls] = index
+        for obj in self.of_type(cls): index.add(obj)
+        return index
+    def of_type(self, cls) -> Iterator[T]:
+        """Iterates the objects whose class is exactly cls."""
+        return self._live(self._buckets.get(cls, []))
+    def get_list(self) -> List[T]: return [obj for obj in self._objects if obj is not None]
+    def count_by_type(self) -> Dict[str, int]:
+        """Live objects per class name (debug overlay); walks the buckets, so keep it off the hot path."""
+        return {cls.__name__: n for cls, bucket in self._buckets.items() if (n := sum(obj is not None for obj in bucket))}
+    def clear(self):
+        # Running passes keep iterating the old lists: blank them (holes only) and start over with fresh ones
+        if self._iterating:
+            for seq in (self._objects, *self._buckets.values()): seq[:] = [None] * len(seq)
+        self._objects = []; self._buckets = {}; self._slots.clear(); self._holes = 0
+        for index in self._indexes.values(): index.clear()
     def update_all(self, dt, **kwargs):
-        for obj in self._objects[:]: obj.update(dt, **kwargs)
-    def draw_all(self, surface):
-        for obj in self._objects: obj.draw(surface)
+        for obj in self: obj.update(dt, **kwargs)
+    def draw_all(self, surface, *args) -> List[pygame.Rect]:
+        """Draws every object (extra args, e.g. a RenderContext, are forwarded) and returns the rects they reported as touched."""
+        rects = []
+        for obj in self:
+            rect = obj.draw(surface, *args)
+            if rect: rects.append(rect)
+        return rects
+    def _live(self, seq):
+        # Objects added during the pass land past the initial length and are not visited
+        self._iterating += 1
+        try:
+            for i in range(len(seq)):
+                obj = seq[i]
+                if obj is not None: yield obj
+        finally:
+            self._iterating -= 1
+            if self._holes * self.COMPACT_RATIO > len(self._objects): self._compact()
+    def _compact(self):
+        if self._iterating or not self._holes: return
+        self._objects = [obj for obj in self._objects if obj is not None]
+        self._buckets = {cls: [obj for obj in bucket if obj is not None] for cls, bucket in self._buckets.items()}
+        bucket_slots = {id(obj): i for bucket in self._buckets.values() for i, obj in enumerate(bucket)}
+        self._slots = {id(obj): (i, obj.__class__, bucket_slots[id(obj)]) for i, obj in enumerate(self._objects)}
+        self._holes = 0
+
+# --- RETAINED UI ---
+class Label:
+    """Text at a fixed anchor, rasterized again only when its string, font or colour changes."""
+    def __init__(self, x, y, align="center"):
+        self._x = x; self._y = y; self._align = align; self._key = None; self._surface = None; self._rect = None
+    def draw(self, surface, text, font, color):
+        key = (str(text), font, color)
+        if key != self._key:
+            self._key = key; self._surface = font.render(key[0], True, color)
+            self._rect = _align_rect(self._surface.get_rect(), self._x, self._y, self._align)
+        return surface.blit(self._surface, self._rect)
+
+class RetainedWidget(UIElement):
+    """
+    UI element drawn from cached surfaces. _render_key() lists everything the look
+    depends on; the widget repaints (in local coordinates) only when that key is new.
+    """
+    MAX_CACHED = 4
+    TRANSPARENT = (255, 0, 255)   # colour key for the rounded corners; widgets are opaque inside
+    def __init__(self, x, y, w, h): super().__init__(x, y, w, h); self._cached = {}
+    def _render_key(self): return (loc.current_lang, theme_mgr.current_theme)
+    @abstractmethod
+    def _render(self, surf, rect): pass
+    def draw(self, surface):
+        key = self._render_key(); cached = self._cached.get(key)
+        if cached is None:
+            if len(self._cached) >= self.MAX_CACHED: self._cached.clear()
+            cached = self._cached[key] = pygame.Surface(self._rect.size)
+            cached.fill(self.TRANSPARENT); self._render(cached, cached.get_rect())
+            cached.set_colorkey(self.TRANSPARENT, pygame.RLEACCEL)
+        return surface.blit(cached, self._rect)
 
 # --- UI CLASSES ---
-class Button(UIElement):
+class Button(RetainedWidget):
     def __init__(self, x, y, w, h, text_key, btn_type, font, color_override=None):
         super().__init__(x, y, w, h)
         self._text_key = text_key
@@ -170,7 +269,8 @@ class Button(UIElement):
     def update(self, dt, **kwargs):
         mouse_pos = kwargs.get("mouse_pos")
         self._is_hovered = self._rect.collidepoint(mouse_pos) if mouse_pos else False
-    def draw(self, surface):
+    def _render_key(self): return (self._is_hovered, self._btn_type, self._text_key, self._font, self._color_override, loc.current_lang, theme_mgr.current_theme)
+    def _render(self, surf, rect):
         if self._color_override:
              color = self._color_override
              if self._is_hovered: color = (min(255, color[0]+20), min(255, color[1]+20), min(255, color[2]+20))
@@ -178,10 +278,10 @@ class Button(UIElement):
             if self._btn_type == "active": color = theme_mgr.get("btn_active")
             elif self._is_hovered: color = theme_mgr.get("btn_hover")
             else: color = theme_mgr.get("btn_color")
-        pygame.draw.rect(surface, color, self._rect, border_radius=10)
-        text_y = self._rect.centery - self._font.get_height() // 2
+        pygame.draw.rect(surf, color, rect, border_radius=10)
+        text_y = rect.centery - self._font.get_height() // 2
         text_col = theme_mgr.get("btn_text_color")
-        draw_text(surface, loc.get(self._text_key), self._font, self._rect.centerx, text_y, color=text_col)
+        draw_text(surf, loc.get(self._text_key), self._font, rect.centerx, text_y, color=text_col)
     def check_click(self, event) -> bool: return event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self._is_hovered
     def set_type(self, btn_type): self._btn_type = btn_type
     def set_text_key(self, key): self._text_key = key
@@ -206,13 +306,14 @@ class Slider(UIElement):
         knob_x = self._rect.left + pct * self._rect.w; knob_col = theme_mgr.get("slider_knob")
         pygame.draw.circle(surface, knob_col, (int(knob_x), int(line_y)), 10)
         txt_col = theme_mgr.get("text_color"); val_percent = int(pct * 100)
-        draw_text(surface, f"{val_percent}", self._font, self._rect.right + 15, self._rect.y, color=txt_col, align="left")
+        text_rect = draw_text(surface, f"{val_percent}", self._font, self._rect.right + 15, self._rect.y, color=txt_col, align="left")
+        return self._rect.inflate(20, 20).union(text_rect)
 
 class ConfirmationModal:
     def __init__(self, game):
         self._game = game; self._rect = pygame.Rect(50, 300, 400, 200)
         self._btn_yes = Button(100, 420, 100, 50, "YES", "normal", game.FONT_SMALL) 
-        self._btn_no = Button(300, 420, 100, 50, "NO", "normal", game.FONT_SMALL)
+        self._btn_no = Button(300, 420, 100, 50, "NO", "normal", game.FONT_SMALL); self._lbl_title = Label(WIDTH//2, 330)
     def handle_event(self, event):
         mouse_pos = pygame.mouse.get_pos()
         self._btn_yes.update(0, mouse_pos=mouse_pos); self._btn_no.update(0, mouse_pos=mouse_pos)
@@ -223,15 +324,16 @@ class ConfirmationModal:
         mouse_pos = pygame.mouse.get_pos()
         self._btn_yes.update(0, mouse_pos=mouse_pos); self._btn_no.update(0, mouse_pos=mouse_pos)
     def draw(self, surface):
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); overlay.fill((0,0,0, 150)); surface.blit(overlay, (0,0))
+        overlays.draw(surface, BLACK, 150)
         bg_col = theme_mgr.get("modal_bg"); border_col = theme_mgr.get("platform_color"); text_col = theme_mgr.get("text_color")
         if theme_mgr.current_theme == "dark": text_col = WHITE
         pygame.draw.rect(surface, bg_col, self._rect, border_radius=15)
         pygame.draw.rect(surface, border_col, self._rect, width=3, border_radius=15)
-        draw_text(surface, loc.get("ARE_YOU_SURE"), self._game.FONT_MEDIUM, WIDTH//2, 330, text_col) 
+        self._lbl_title.draw(surface, loc.get("ARE_YOU_SURE"), self._game.FONT_MEDIUM, text_col)
         self._btn_yes.draw(surface); self._btn_no.draw(surface)
+        return surface.get_rect()
 
-class ShopItemButton(UIElement):
+class ShopItemButton(RetainedWidget):
     def __init__(self, x, y, w, h, name, price, category, game, val=None):
         super().__init__(x, y, w, h)
         self._name = name; self._price = price; self._category = category; self._game = game; self._val = val if val is not None else name; self._is_hovered = False
@@ -242,14 +344,18 @@ class ShopItemButton(UIElement):
     def update(self, dt, **kwargs):
         mouse_pos = kwargs.get("mouse_pos")
         self._is_hovered = self._rect.collidepoint(mouse_pos) if mouse_pos else False
-    def draw(self, surface):
-        color = (50, 50, 80); 
-        if self._is_hovered: color = (70, 70, 100)
-        pygame.draw.rect(surface, color, self._rect, border_radius=10)
+    def _render_key(self):
         owned = self._game.has_item(self._category, self._val); equipped = self._game.is_equipped(self._category, self._val)
+        affordable = self._game.get_currency() >= self._price
+        return (self._is_hovered, owned, equipped, affordable, self._game.FONT_SMALL, self._game.FONT_TINY, loc.current_lang)
+    def _render(self, surf, rect):
+        is_hovered, owned, equipped, affordable = self._render_key()[:4]
+        color = (50, 50, 80); 
+        if is_hovered: color = (70, 70, 100)
+        pygame.draw.rect(surf, color, rect, border_radius=10)
         status_text = f"{self._price}"; status_color = WHITE
         if equipped: status_text = loc.get("EQUIPPED"); status_color = GREEN_BUY
         elif owned: status_text = loc.get("OWNED"); status_color = (150, 255, 150)
-        elif self._game.get_currency() < self._price: status_color = RED_ERROR
-        draw_text(surface, loc.get(self._name), self._game.FONT_SMALL, self._rect.centerx, self._rect.top + 20, WHITE)
-        draw_text(surface, status_text, self._game.FONT_TINY, self._rect.centerx, self._rect.bottom - 30, status_color)
\ No newline at end of file
+        elif not affordable: status_color = RED_ERROR
+        draw_text(surf, loc.get(self._name), self._game.FONT_SMALL, rect.centerx, rect.top + 20, WHITE)
+        draw_text(surf, status_text, self._game.FONT_TINY, rect.centerx, rect.bottom - 30, status_color)
\ No newline at end of file
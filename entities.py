@@ -1,12 +1,19 @@
 import pygame
 import random
 import math
+import numpy as np
+from collections import deque
+from typing import NamedTuple
 from config import *
 from engine import GameObject, theme_mgr, clamp
+from render import WaveStrip, star_sprites, trail_sprites, glow_frames, cloud_atlas
+
+# Background scenery draws from its own RNG so it never shifts the gameplay sequence (replays re-seed `random`)
+_scenery_rng = random.Random()
 
 class ProceduralWave(GameObject):
     def __init__(self, index):
-        self._index = index; self._phase = random.uniform(0, 2 * math.pi); self._wobble_speed = random.uniform(1.0, 2.0)
+        self._index = index; self._phase = _scenery_rng.uniform(0, 2 * math.pi); self._wobble_speed = _scenery_rng.uniform(1.0, 2.0)
         self._update_params_from_theme()
 
     def _update_params_from_theme(self):
@@ -15,11 +22,12 @@ class ProceduralWave(GameObject):
             params = elements[self._index]; self._type = params["type"]; self._speed = params["speed"]
             if self._type == "wave":
                 self._color = params["color"]; self._amplitude = params["amp"]; self._frequency = params["freq"]
-                self._y_offset = params["y"]; self._surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+                self._y_offset = params["y"]; self._strip = WaveStrip(self._color, self._amplitude, self._frequency, self._y_offset)
             elif self._type == "cloud":
                 self._x_base = params["x"]; self._y_base = params["y"]; self._radius = params["size"]
                 self._alpha = params.get("alpha", 100); self._float_speed = params.get("sway_speed", 1.0)
                 self._float_amp = params.get("sway_amp", 20); self._draw_x = self._x_base; self._draw_y = self._y_base
+                cloud_atlas.prepare(self._radius, self._alpha)
         else:
             self._type = "none"; self._speed = 0
 
@@ -29,26 +37,17 @@ class ProceduralWave(GameObject):
         if self._type == "cloud":
             self._y_base += self._speed * 60 * dt
             if self._y_base > HEIGHT + self._radius * 2: 
-                self._y_base = -self._radius * 2; self._x_base = random.randint(0, WIDTH)
+                self._y_base = -self._radius * 2; self._x_base = _scenery_rng.randint(0, WIDTH)
             current_time = pygame.time.get_ticks() / 1000.0
             sway_offset = math.sin(current_time * self._float_speed + self._index) * self._float_amp
             self._draw_x = self._x_base + sway_offset; self._draw_y = self._y_base
 
     def draw(self, surface):
-        if self._type == "wave":
-            self._surface.fill((0, 0, 0, 0))
-            points = [(x, self._amplitude * math.sin(self._frequency * x + self._phase) + self._y_offset) for x in range(WIDTH + 1)]
-            points.extend([(WIDTH, HEIGHT), (0, HEIGHT)])
-            pygame.draw.polygon(self._surface, self._color, points)
-            surface.blit(self._surface, (0, 0))
+        if self._type == "wave": return self._strip.draw(surface, self._phase)
         elif self._type == "cloud":
-            pulse = math.sin(self._phase * self._wobble_speed) * 3
-            current_radius = self._radius + pulse; surf_size = int(current_radius * 3) 
-            cloud_surf = pygame.Surface((surf_size, surf_size), pygame.SRCALPHA)
-            center = (surf_size // 2, surf_size // 2)
-            pygame.draw.circle(cloud_surf, (255, 255, 255, int(self._alpha * 0.4)), center, int(current_radius * 1.5))
-            pygame.draw.circle(cloud_surf, (255, 255, 255, self._alpha), center, int(current_radius * 0.7))
-            surface.blit(cloud_surf, (self._draw_x - surf_size // 2, self._draw_y - surf_size // 2))
+            pulse = math.sin(self._phase * self._wobble_speed) * cloud_atlas.PULSE
+            cloud_surf = cloud_atlas.sprite(int(round(self._radius + pulse)), self._alpha); half = cloud_surf.get_width() // 2
+            return surface.blit(cloud_surf, (self._draw_x - half, self._draw_y - half))
 
 class Particle(GameObject):
     def __init__(self, x, y, specific_color=None):
@@ -62,67 +61,147 @@ class Particle(GameObject):
         return self._lifetime > 0 and self._size > 1
 
     def draw(self, surface):
-        if self._size > 0: pygame.draw.circle(surface, self._color, (self._x, self._y), int(self._size))
+        if self._size > 0: return pygame.draw.circle(surface, self._color, (self._x, self._y), int(self._size))
+
+class ParticleSystem:
+    """
+    @class ParticleSystem
+    @brief Structure-of-arrays particle pool backed by preallocated NumPy arrays.
+    @details Bursts are emitted in bulk, motion and culling are vectorized and
+             live particles stay packed in [0, count). Drawing is one batched
+             Surface.blits() call of small cached circle sprites. Emission past
+             the hard capacity cap is dropped.
+    """
+    COLOR_KEY = (255, 0, 255)
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = capacity; self._count = 0; self._rng = np.random.default_rng()
+        self._pos = np.zeros((capacity, 2), np.float32); self._vel = np.zeros((capacity, 2), np.float32)
+        self._size = np.zeros(capacity, np.float32); self._life = np.zeros(capacity, np.float32)
+        self._color = np.zeros(capacity, np.int16)
+        self._palette: list = []; self._palette_index: dict = {}; self._sprites: dict = {}
+
+    def __len__(self): return self._count
+    def clear(self): self._count = 0
+
+    def emit(self, x, y, count: int, color=None) -> None:
+        count = min(count, self._capacity - self._count)
+        if count <= 0: return
+        color = tuple(color or theme_mgr.get("particle_color") or (255, 255, 255))
+        index = self._palette_index.get(color)
+        if index is None: index = self._palette_index[color] = len(self._palette); self._palette.append(color)
+        burst = slice(self._count, self._count + count)
+        self._pos[burst] = (x, y); self._vel[burst] = self._rng.uniform(-150, 150, (count, 2))
+        self._size[burst] = self._rng.uniform(2, 5, count); self._life[burst] = self._rng.uniform(0.2, 0.5, count)
+        self._color[burst] = index; self._count += count
+
+    def update(self, dt) -> None:
+        n = self._count
+        if not n: return
+        self._pos[:n] += self._vel[:n] * dt; self._life[:n] -= dt; self._size[:n] -= 5 * dt
+        alive = (self._life[:n] > 0) & (self._size[:n] > 1)
+        k = int(np.count_nonzero(alive))
+        if k < n:
+            for arr in (self._pos, self._vel, self._size, self._life, self._color): arr[:k] = arr[:n][alive]
+            self._count = k
+
+    def _sprite(self, color_index: int, radius: int):
+        sprite = self._sprites.get((color_index, radius))
+        if sprite is None:
+            sprite = self._sprites[(color_index, radius)] = pygame.Surface((radius * 2, radius * 2))
+            sprite.fill(self.COLOR_KEY); sprite.set_colorkey(self.COLOR_KEY, pygame.RLEACCEL)
+            pygame.draw.circle(sprite, self._palette[color_index], (radius, radius), radius)
+        return sprite
+
+    def draw(self, surface):
+        n = self._count
+        if not n: return None
+        radii = self._size[:n].astype(np.int32); top_left = (self._pos[:n] - radii[:, None]).astype(np.int32)
+        sprites = [self._sprite(c, r) for c, r in zip(self._color[:n].tolist(), radii.tolist())]
+        surface.blits(list(zip(sprites, top_left.tolist())), doreturn=False)
+        x0, y0 = top_left.min(axis=0); x1, y1 = (top_left + 2 * radii[:, None]).max(axis=0)
+        return pygame.Rect(int(x0), int(y0), int(x1 - x0), int(y1 - y0))
+
+class RenderContext(NamedTuple):
+    """Equipment and palette resolved once, so entity draw() reads plain attributes."""
+    theme: str
+    basket_width: int
+    basket_color: tuple
+    star_shape: str
+    star_color: tuple
+    halo_color: tuple
+    halo_alpha: int
+    text_color: tuple
+
+def build_render_context(game) -> RenderContext:
+    light = theme_mgr.current_theme == "light"
+    return RenderContext(theme_mgr.current_theme, Basket.BASE_WIDTH + (game.get_equipped("size") or 0) * 30,
+                         theme_mgr.shop_colors.get(game.get_equipped("color")) or theme_mgr.get("platform_color"), game.get_equipped("shape"),
+                         (255, 229, 180), (255, 255, 255) if light else (255, 255, 204), 150 if light else 100, theme_mgr.get("text_color"))
 
 class Basket(GameObject):
+    BASE_WIDTH = 150
     def __init__(self, game):
-        self._game = game; self._base_width = 150; self._height = 20
+        self._game = game; self._base_width = self.BASE_WIDTH; self._height = 20
         self._x = WIDTH // 2 - self._base_width // 2; self._y = HEIGHT - 80
-        self._base_vel = 9; self._vel = self._base_vel
-
-    def _get_current_properties(self):
-        size_mod = self._game.get_equipped("size"); color_name = self._game.get_equipped("color")
-        width = self._base_width + (size_mod * 30)
-        color = theme_mgr.shop_colors.get(color_name) or theme_mgr.get("platform_color")
-        return width, color
+        self._base_vel = 9; self._vel = self._base_vel; self._prev_x = self._x
 
+    # Speeds are in pixels per reference frame (1 / FPS s); updates scale them by FPS * dt
     def update(self, dt, **kwargs):
-        width, _ = self._get_current_properties(); keys = kwargs.get("keys"); speed_multiplier = kwargs.get("speed_multiplier", 1.0)
+        self._prev_x = self._x
+        width = self._game.get_render_context().basket_width; keys = kwargs.get("keys"); speed_multiplier = kwargs.get("speed_multiplier", 1.0)
         if not keys: return
-        self._vel = min(MAX_PLATFORM_SPEED, self._base_vel + (speed_multiplier - 1.0) * 3.0)
+        self._vel = min(MAX_PLATFORM_SPEED, self._base_vel + (speed_multiplier - 1.0) * 3.0); step = self._vel * FPS * dt
         if keys[pygame.K_LEFT] or keys[pygame.K_a]: 
-            if self._x > 0: self._x -= self._vel
+            if self._x > 0: self._x -= step
         if keys[pygame.K_RIGHT] or keys[pygame.K_d]: 
-            if self._x < WIDTH - width: self._x += self._vel
+            if self._x < WIDTH - width: self._x += step
 
     def get_vel(self) -> float: return self._vel
-    def get_rect(self) -> pygame.Rect:
-        width, _ = self._get_current_properties(); return pygame.Rect(self._x, self._y, width, self._height)
-    def draw(self, surface):
-        width, color = self._get_current_properties(); rect = pygame.Rect(self._x, self._y, width, self._height)
-        pygame.draw.rect(surface, color, rect, border_radius=5)
+    def get_x(self) -> float: return self._x
+    def get_rect(self) -> pygame.Rect: return pygame.Rect(self._x, self._y, self._game.get_render_context().basket_width, self._height)
+    def draw(self, surface, ctx: RenderContext, alpha: float = 1.0):
+        x = self._prev_x + (self._x - self._prev_x) * alpha
+        return pygame.draw.rect(surface, ctx.basket_color, pygame.Rect(x, self._y, ctx.basket_width, self._height), border_radius=5)
 
 class Currency(GameObject):
+    _y_column = None; _y_slot = 0   # collisions.YColumn this coin mirrors its y into (bind_y)
     def __init__(self, speed_multiplier):
         self._x = random.randint(50, WIDTH - 50); self._y = random.randint(-200, -20)
-        self._speed = 3.0 * speed_multiplier; self._size = 20; self._angle = 0
+        self._speed = 3.0 * speed_multiplier; self._size = 20; self._angle = 0; self._prev_y = self._y
     def update(self, dt, **kwargs):
-        self._y += self._speed * kwargs.get("speed_multiplier", 1.0); self._angle += 2
+        self._prev_y = self._y; self._y += self._speed * kwargs.get("speed_multiplier", 1.0) * FPS * dt; self._angle += 2 * FPS * dt
+        if self._y_column is not None: self._y_column.ys[self._y_slot] = self._y
+    def bind_y(self, column, slot: int): self._y_column = column; self._y_slot = slot
     def get_y(self) -> float: return self._y
+    def get_pos(self) -> tuple[float, float]: return (self._x, self._y)
     def get_rect(self) -> pygame.Rect: return pygame.Rect(self._x - self._size, self._y - self._size, self._size*2, self._size*2)
-    def draw(self, surface):
-        if theme_mgr.current_theme == "dark":
-            points = [ (self._x, self._y - self._size), (self._x + self._size/2, self._y), (self._x, self._y + self._size), (self._x - self._size/2, self._y) ]
+    def draw(self, surface, ctx: RenderContext, alpha: float = 1.0):
+        x = self._x; y = self._prev_y + (self._y - self._prev_y) * alpha
+        if ctx.theme == "dark":
+            points = [ (x, y - self._size), (x + self._size/2, y), (x, y + self._size), (x - self._size/2, y) ]
             pygame.draw.polygon(surface, (255, 255, 100), points)
-            pygame.draw.circle(surface, (255, 255, 200, 100), (int(self._x), int(self._y)), int(self._size * 0.8))
+            pygame.draw.circle(surface, (255, 255, 200, 100), (int(x), int(y)), int(self._size * 0.8))
         else:
             for i in range(5):
                 angle_rad = math.radians(self._angle + i * 72)
-                px = self._x + math.cos(angle_rad) * (self._size * 0.6); py = self._y + math.sin(angle_rad) * (self._size * 0.6)
+                px = x + math.cos(angle_rad) * (self._size * 0.6); py = y + math.sin(angle_rad) * (self._size * 0.6)
                 pygame.draw.circle(surface, (255, 180, 180), (int(px), int(py)), int(self._size * 0.5))
-            pygame.draw.circle(surface, (255, 220, 100), (int(self._x), int(self._y)), int(self._size * 0.4))
+            pygame.draw.circle(surface, (255, 220, 100), (int(x), int(y)), int(self._size * 0.4))
+        reach = int(self._size * 1.2); return pygame.Rect(x - reach, y - reach, reach * 2, reach * 2)
 
 class Star(GameObject):
+    _y_column = None; _y_slot = 0   # collisions.YColumn this star mirrors its y into (bind_y)
     def __init__(self, speed_multiplier, game_ref, fixed_x=None, note_name=None):
         self._game = game_ref
         if fixed_x is not None: self._x = fixed_x; self._is_rhythm_note = True
         else: self._x = random.randint(100, WIDTH - 100); self._is_rhythm_note = False
             
-        self._y = random.randint(-200, -20); self._z = random.uniform(0.1, 1.0)
+        self._y = self._prev_y = random.randint(-200, -20); self._z = random.uniform(0.1, 1.0)
         self._base_speed = random.uniform(1.4, 1.6); self._vel = self._base_speed * speed_multiplier
         self._base_size = 5 + self._z * 5; self._points = int(15 - (self._z * 10))
         self._blink_timer = random.uniform(0, 2 * math.pi); self._blink_speed = random.uniform(1.0, 3.0)
-        self._trail = []; self._max_trail_length = 15; self._note_name = note_name
+        self._max_trail_length = 15; self._trail = deque(maxlen=self._max_trail_length); self._note_name = note_name
 
         if theme_mgr.current_theme == "light": self._specific_color = random.choice(theme_mgr.light_theme_star_colors); self._base_size = 20
         else: self._specific_color = None
@@ -130,48 +209,46 @@ class Star(GameObject):
     def get_note_name(self): return self._note_name
     def get_size_category(self) -> str: return 'large' if self._z > 0.7 else ('medium' if self._z > 0.4 else 'small')
     def get_color(self): return self._specific_color if self._specific_color else PASTEL_CREAM
-    def set_y(self, y): self._y = y
+    def set_y(self, y):
+        self._y = self._prev_y = y
+        if self._y_column is not None: self._y_column.ys[self._y_slot] = y
+    def bind_y(self, column, slot: int): self._y_column = column; self._y_slot = slot
 
     def update(self, dt, **kwargs):
         speed_multiplier = kwargs.get("speed_multiplier", 1.0); rhythm_speed = kwargs.get("speed")
         if self._is_rhythm_note and rhythm_speed: self._vel = rhythm_speed * speed_multiplier
         else: self._vel = self._base_speed * speed_multiplier
         
-        self._y += self._vel; self._blink_timer += self._blink_speed * dt
-        if self._is_rhythm_note:
-            self._trail.append((self._x, self._y))
-            if len(self._trail) > self._max_trail_length: self._trail.pop(0)
+        self._prev_y = self._y; self._y += self._vel * FPS * dt; self._blink_timer += self._blink_speed * dt
+        if self._y_column is not None: self._y_column.ys[self._y_slot] = self._y
+        if self._is_rhythm_note: self._trail.append((self._x, self._y))
 
     def get_y(self) -> float: return self._y
     def get_points(self) -> int: return self._points
     def get_pos(self) -> tuple[float, float]: return (self._x, self._y)
+    def get_draw_pos(self, alpha: float) -> tuple[float, float]: return (self._x, self._prev_y + (self._y - self._prev_y) * alpha)
     def get_rect(self) -> pygame.Rect: return pygame.Rect(self._x - self._base_size, self._y - self._base_size, self._base_size * 2, self._base_size * 2)
 
-    def draw(self, surface):
-        shape = self._game.get_equipped("shape"); p = clamp((math.sin(self._blink_timer) * 0.5 + 0.5), 0, 1)
-        current_size = self._base_size * (0.8 + p * 0.4) 
-        if theme_mgr.current_theme == "light": base_color = self._specific_color; halo_color = (255, 255, 255); halo_alpha_base = 150 
-        else: base_color = (255, 229, 180); halo_color = (255, 255, 204); halo_alpha_base = 100
+    def draw(self, surface, ctx: RenderContext, alpha: float = 1.0):
+        x, y = self.get_draw_pos(alpha); shape = ctx.star_shape; p = clamp((math.sin(self._blink_timer) * 0.5 + 0.5), 0, 1)
+        current_size = self._base_size * (0.8 + p * 0.4); halo_color = ctx.halo_color; halo_alpha_base = ctx.halo_alpha
+        base_color = (self._specific_color or ctx.star_color) if ctx.theme == "light" else ctx.star_color
 
         if self._is_rhythm_note:
-             if len(self._trail) > 1:
-                for i, (tx, ty) in enumerate(self._trail):
-                    alpha = int(150 * (i / len(self._trail))); t_size = max(1, int(self._base_size * (i / len(self._trail)) * 0.8))
-                    s_trail = pygame.Surface((t_size*2, t_size*2), pygame.SRCALPHA)
-                    pygame.draw.circle(s_trail, (*base_color, alpha), (t_size, t_size), t_size)
-                    surface.blit(s_trail, (tx - t_size, ty - t_size))
-             s = pygame.Surface((int(current_size*4), int(current_size*4)), pygame.SRCALPHA)
-             pygame.draw.circle(s, (*halo_color, halo_alpha_base), (int(current_size*2), int(current_size*2)), int(current_size*1.6))
-             pygame.draw.circle(s, (*base_color, 255), (int(current_size*2), int(current_size*2)), int(current_size))
-             surface.blit(s, (self._x - current_size*2, self._y - current_size*2))
+             n = len(self._trail)
+             if n > 1:
+                first_y, head_y = self._trail[0][1], self._trail[-1][1]
+                trail, half_w, above = trail_sprites.sprite(self._base_size, base_color, n, (head_y - first_y) / (n - 1))
+                trail_rect = surface.blit(trail, (x - half_w, y - above))
+             sprite, half = star_sprites.frame(ctx.theme, self._base_size, base_color, halo_color, halo_alpha_base, False, p)
+             rect = surface.blit(sprite, (x - half, y - half))
+             return rect.union(trail_rect) if n > 1 else rect
         else:
-            if shape == "Square": pygame.draw.rect(surface, base_color, pygame.Rect(self._x - current_size, self._y - current_size, current_size*2, current_size*2))
-            elif shape == "Triangle": pygame.draw.polygon(surface, base_color, [(self._x, self._y - current_size), (self._x + current_size, self._y + current_size), (self._x - current_size, self._y + current_size)])
+            if shape == "Square": return pygame.draw.rect(surface, base_color, pygame.Rect(x - current_size, y - current_size, current_size*2, current_size*2))
+            elif shape == "Triangle": return pygame.draw.polygon(surface, base_color, [(x, y - current_size), (x + current_size, y + current_size), (x - current_size, y + current_size)])
             else: 
-                s = pygame.Surface((int(current_size*4), int(current_size*4)), pygame.SRCALPHA)
-                pygame.draw.circle(s, (*halo_color, int(halo_alpha_base * (0.7 + p * 0.3))), (int(current_size*2), int(current_size*2)), int(current_size*1.6))
-                pygame.draw.circle(s, (*base_color, 255), (int(current_size*2), int(current_size*2)), int(current_size))
-                surface.blit(s, (self._x - current_size*2, self._y - current_size*2))
+                sprite, half = star_sprites.frame(ctx.theme, self._base_size, base_color, halo_color, halo_alpha_base, True, p)
+                return surface.blit(sprite, (x - half, y - half))
 
 # =============================================================================
 # DECORATOR PATTERN (Structural)
@@ -197,39 +274,32 @@ class GoldenGlow(GameObject):
         """
         self._wrapped = wrapped
         self._pulse_timer = 0.0
+        # Pulse frames are shared by every glow around a star of this size
+        rect = wrapped.get_rect()
+        self._frames = glow_frames.ring(max(rect.width, rect.height) // 2, self.GLOW_COLOR, self.GLOW_ALPHA)
 
     # --- Forward all Star-specific getters to the wrapped object ---
     def get_y(self) -> float:           return self._wrapped.get_y()
     def get_points(self) -> int:        return self._wrapped.get_points() * self.POINT_MULTIPLIER
     def get_pos(self) -> tuple:         return self._wrapped.get_pos()
+    def get_draw_pos(self, alpha) -> tuple: return self._wrapped.get_draw_pos(alpha)
     def get_rect(self) -> pygame.Rect:  return self._wrapped.get_rect()
     def get_color(self):                return self.GLOW_COLOR
     def get_note_name(self):            return self._wrapped.get_note_name()
     def get_size_category(self) -> str: return self._wrapped.get_size_category()
     def set_y(self, y):                 self._wrapped.set_y(y)
+    def bind_y(self, column, slot):     self._wrapped.bind_y(column, slot)
 
     def update(self, dt, **kwargs):
         self._wrapped.update(dt, **kwargs)
         self._pulse_timer += dt * 4.0   # pulse speed
 
-    def draw(self, surface):
+    def draw(self, surface, ctx: RenderContext, alpha: float = 1.0):
         # 1. Draw the base star first
-        self._wrapped.draw(surface)
-
-        # 2. Draw golden halo on top
-        x, y = self._wrapped.get_pos()
-        rect = self._wrapped.get_rect()
-        radius = max(rect.width, rect.height) // 2
-
-        pulse = math.sin(self._pulse_timer) * 0.3 + 1.0   # oscillates 0.7 – 1.3
-        glow_radius = int(radius * 2.0 * pulse)
-
-        if glow_radius > 0:
-            glow_surf = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(
-                glow_surf,
-                (*self.GLOW_COLOR, self.GLOW_ALPHA),
-                (glow_radius, glow_radius),
-                glow_radius
-            )
-            surface.blit(glow_surf, (x - glow_radius, y - glow_radius))
+        star_rect = self._wrapped.draw(surface, ctx, alpha)
+
+        # 2. Draw golden halo on top — one blit of the frame for this pulse phase
+        x, y = self._wrapped.get_draw_pos(alpha)
+        glow_surf, glow_radius = self._frames[glow_frames.frame_index(self._pulse_timer)]
+        glow_rect = surface.blit(glow_surf, (x - glow_radius, y - glow_radius))
+        return glow_rect.union(star_rect) if star_rect else glow_rect
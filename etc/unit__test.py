@@ -34,6 +34,17 @@ import main
 import engine
 import entities
 import states
+import render
+import collisions
+import simulate
+import replay
+import profiler
+import metrics
+import gamelog
+import persistence
+import soundbank
+import assetpack
+import events
 from config import *
 
 class TestRetinalMegaSuite(unittest.TestCase):
@@ -54,6 +65,10 @@ class TestRetinalMegaSuite(unittest.TestCase):
             "equipped": {"color": "Default", "shape": "Star", "size": 0}
         }
 
+    def tearDown(self):
+        """Гістограми метрик не переходять між тестами (і не логуються при виході, коли потоки pytest вже закриті)"""
+        metrics.reset()
+
     # =========================================================================
     # BLOCK 1: Engine & Utils (Тестуємо engine.py та config.py)
     # =========================================================================
@@ -216,5 +231,394 @@ class TestRetinalMegaSuite(unittest.TestCase):
         self.assertEqual(actual_count, expected_count,
             f"ObjectManager має мати {expected_count} хвиль, а не {actual_count}")
 
+    # =========================================================================
+    # BLOCK 6: Rendering caches (Тестуємо render.py)
+    # =========================================================================
+
+    def test_16_wave_strip_offset_is_periodic(self):
+        """Зсув смуги хвилі завжди в межах одного періоду, навіть для від'ємної фази"""
+        import math
+        strip = render.WaveStrip((60, 20, 80, 100), 70, 0.012, 610)
+        period = 2 * math.pi / 0.012
+        for phase in (0.0, 1.3, -2.2, 100.7):
+            offset = strip.offset(phase)
+            self.assertGreaterEqual(offset, 0)
+            self.assertLess(offset, period)
+        self.assertEqual(strip.offset(0.5), strip.offset(0.5 + 2 * math.pi))
+
+    def test_17_star_sprite_cache_bounded_and_invalidated(self):
+        """Кеш спрайтів зірок обмежений LRU і очищується при зміні теми"""
+        cache = render.StarSprites(max_cycles=4)
+        for size in range(10):
+            cache.frame("dark", 5 + size, (255, 229, 180), (255, 255, 204), 100, True, 0.5)
+        self.assertEqual(len(cache), 4)
+        # Той самий квантований розмір не створює новий цикл кадрів
+        cache.frame("dark", 14.1, (255, 229, 180), (255, 255, 204), 100, True, 1.0)
+        self.assertEqual(len(cache), 4)
+        cache.on_event("theme_switched", {"theme": "light"})
+        self.assertEqual(len(cache), 0)
+
+    def test_18_rhythm_trail_length_and_sprite_reuse(self):
+        """Шлейф ноти не довший за _max_trail_length, а спрайт шлейфу береться з кешу"""
+        star = entities.Star(5.0, self.game, fixed_x=100, note_name="c4")
+        for _ in range(40): star.update(1 / 60, speed=5.0)
+        self.assertEqual(len(star._trail), star._max_trail_length)
+        cache = render.TrailSprites()
+        for _ in range(3): cache.sprite(8.0, (255, 229, 180), 15, 5.0)
+        cache.sprite(8.0, (255, 229, 180), 14, 5.0)
+        self.assertEqual(len(cache), 2)
+
+    def test_19_golden_glow_shares_frames(self):
+        """Декоратори GoldenGlow однакового розміру ділять одне кільце кадрів сяйва"""
+        a = entities.Star(1.0, self.game); b = entities.Star(1.0, self.game)
+        a._base_size = b._base_size = 8
+        glow_a, glow_b = entities.GoldenGlow(a), entities.GoldenGlow(b)
+        self.assertIs(glow_a._frames, glow_b._frames)
+        self.assertEqual(len(glow_a._frames), render.GlowFrames.FRAMES)
+        # Декоратор і далі делегує обгорнутій зірці
+        self.assertEqual(glow_a.get_points(), a.get_points() * entities.GoldenGlow.POINT_MULTIPLIER)
+
+    def test_20_cloud_atlas_buckets_per_theme(self):
+        """Атлас хмар будує спрайт на кожен (радіус, альфа) і скидається при зміні теми"""
+        atlas = render.CloudAtlas()
+        atlas.prepare(30, 80)
+        self.assertEqual(len(atlas), 2 * render.CloudAtlas.PULSE + 1)
+        atlas.prepare(30.2, 80)   # ті самі кошики — нічого нового
+        atlas.sprite(31, 80)
+        self.assertEqual(len(atlas), 2 * render.CloudAtlas.PULSE + 1)
+        atlas.on_event("theme_switched", {"theme": "dark"})
+        self.assertEqual(len(atlas), 0)
+
+    def test_21_overlay_pool_reuses_surfaces(self):
+        """Затемнення екрана не створює нових поверхонь щокадру"""
+        pool = render.OverlayPool()
+        screen = MagicMock(); screen.get_size.return_value = (WIDTH, HEIGHT)
+        for _ in range(5): pool.draw(screen, BLACK, 180)
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(screen.fill.call_count, 5)
+        for _ in range(5): pool.draw(screen, (30, 30, 60), 120)
+        self.assertEqual(len(pool), 1)
+
+    def test_22_static_layer_built_once_per_theme(self):
+        """Статичний шар фону будується ліниво один раз на тему і перебудовується після зміни теми"""
+        layers = render.StaticLayers(); builds = []
+        layers.register("bg", lambda theme: builds.append(theme) or MagicMock())
+        screen = MagicMock()
+        for _ in range(3): layers.draw(screen, "bg", "dark")
+        self.assertEqual(builds, ["dark"])
+        layers.on_event("theme_switched", {"theme": "light"})
+        layers.draw(screen, "bg", "light")
+        self.assertEqual(builds, ["dark", "light"])
+        self.assertEqual(screen.blit.call_count, 4)
+
+    def test_23_draw_all_reports_touched_rects(self):
+        """ObjectManager.draw_all повертає прямокутники, які намалювали об'єкти (режим dirty rects)"""
+        mgr = engine.ObjectManager()
+        drawn, hidden = MagicMock(), MagicMock()
+        drawn.draw.return_value = "rect"; hidden.draw.return_value = None
+        mgr.add(drawn); mgr.add(hidden)
+        self.assertEqual(mgr.draw_all(MagicMock()), ["rect"])
+        state = states.MenuState(self.game)
+        self.assertIsInstance(state.draw(MagicMock()), list)
+        presenter = render.DirtyRectPresenter((WIDTH, HEIGHT)); mock_pygame.display.reset_mock()
+        presenter.present([mock_pygame.Rect(0, 0, 10, 10)], scenery=True)   # хмари світлої теми: повний flip поза статистикою
+        mock_pygame.display.flip.assert_called_once(); mock_pygame.display.update.assert_not_called()
+        self.assertEqual(presenter.stats(), {"frames": 0, "full_flips": 0, "updated_fraction": 0.0, "scenery_frames": 1})
+        self.assertTrue(engine.theme_mgr.themes["light"]["full_screen_scenery"]); self.assertFalse(engine.theme_mgr.themes["dark"]["full_screen_scenery"])
+
+    def test_24_retained_button_repaints_only_on_change(self):
+        """Кнопка перемальовує кешовану поверхню лише при зміні наведення, мови чи теми"""
+        btn = engine.Button(0, 0, 200, 60, "START", "normal", self.game.FONT_MEDIUM)
+        screen = MagicMock()
+        with patch.object(engine.Button, "_render") as render_mock:
+            for _ in range(5): btn.draw(screen)
+            self.assertEqual(render_mock.call_count, 1)
+            btn._is_hovered = True; btn.draw(screen); btn.draw(screen)
+            self.assertEqual(render_mock.call_count, 2)
+            btn._is_hovered = False; btn.draw(screen)   # обидва варіанти вже в кеші
+            self.assertEqual(render_mock.call_count, 2)
+            engine.loc.toggle_lang(); btn.draw(screen)
+            self.assertEqual(render_mock.call_count, 3)
+        self.assertEqual(screen.blit.call_count, 9)
+
+    def test_25_particle_system_capacity_and_culling(self):
+        """Система частинок тримає жорсткий ліміт і векторно прибирає мертві частинки"""
+        system = entities.ParticleSystem(capacity=32)
+        for _ in range(5): system.emit(100, 100, 10, (255, 229, 180))
+        self.assertEqual(len(system), 32)
+        system.update(0.1)
+        self.assertGreater(len(system), 0)
+        system.update(1.0)   # довше за максимальний час життя (0.5 с)
+        self.assertEqual(len(system), 0)
+        playing = states.PlayingState(self.game)
+        self.assertIsInstance(playing._particles, entities.ParticleSystem)
+
+    def test_26_object_manager_handles_and_buckets(self):
+        """Менеджер видаляє за O(1) під час ітерації, веде кошики за типом і ущільнюється"""
+        manager = engine.ObjectManager()
+        stars = [MagicMock(spec=entities.Star) for _ in range(8)]
+        coins = [MagicMock(spec=entities.Currency) for _ in range(2)]
+        for obj in stars + coins: manager.add(obj)
+        self.assertEqual(sum(1 for _ in manager.of_type(entities.Star)), 8)
+        self.assertEqual(list(manager.of_type(entities.Currency)), coins)
+        seen = 0
+        for obj in manager:   # видалення під час обходу без копіювання списку
+            manager.remove(obj); seen += 1
+            if seen == 6: break
+        self.assertEqual(seen, 6)
+        self.assertEqual(len(manager), 4)
+        self.assertEqual(manager.get_list(), stars[6:] + coins)
+        self.assertNotIn(None, manager._objects)   # дірки прибрано після обходу
+        manager.remove(stars[0])   # повторне видалення — без помилки
+        self.assertEqual(len(manager), 4)
+        manager.add(coins[0]); self.assertEqual(len(manager), 4)   # повторне додавання ігнорується
+        manager.remove(coins[0]); self.assertNotIn(coins[0], manager.get_list())
+        visited = []
+        for obj in manager:   # clear() посеред обходу: решта обходу бачить лише дірки
+            visited.append(obj); manager.clear()
+        self.assertEqual((len(visited), len(manager), manager.get_list()), (1, 0, []))
+        manager.add(stars[0]); self.assertEqual(list(manager.of_type(entities.Star)), [stars[0]])
+
+    def test_27_collision_sweep_band_and_misses(self):
+        """Колізії: лише об'єкти біля кошика будують Rect, пропущені — окремим списком"""
+        basket = mock_pygame.Rect(0, 700, 150, 20)
+        basket.collidelistall.side_effect = lambda rects: list(range(len(rects)))
+        far, near, gone = (MagicMock(spec=entities.Star) for _ in range(3))
+        far.get_y.return_value = 100; near.get_y.return_value = 705; gone.get_y.return_value = HEIGHT + 50
+        hits, missed = collisions.CollisionSweep().sweep([far, near, gone], basket)
+        self.assertEqual(hits, [near])
+        self.assertEqual(missed, [gone])
+        far.get_rect.assert_not_called(); gone.get_rect.assert_not_called()
+        self.assertEqual(collisions.CollisionSweep().sweep([], basket), ([], []))
+        manager = engine.ObjectManager(); column = manager.attach_index(entities.Star, collisions.YColumn(capacity=2))
+        stars = [entities.Star(1.0, self.game) for _ in range(3)]
+        for star, y in zip(stars, (100, 690, 705)): star.set_y(y); manager.add(star)
+        manager.add(entities.Currency(1.0)); self.assertEqual(len(column), 3, "Стовпчик росте і містить лише свій клас")
+        stars[0].update(1 / FPS, speed_multiplier=1.0); self.assertEqual(column.ys[stars[0]._y_slot], stars[0].get_y(), "Об'єкт сам пише свій y")
+        stars[1].set_y(HEIGHT + 50); stars[2].get_y = MagicMock(side_effect=AssertionError("sweep не викликає get_y"))
+        hits, missed = collisions.CollisionSweep().sweep(column, basket)
+        self.assertEqual((hits, missed), ([stars[2]], [stars[1]]))
+        manager.remove(stars[1]); self.assertEqual(collisions.CollisionSweep().sweep(column, basket)[1], [])
+        manager.clear(); self.assertEqual(len(column), 0); self.assertIsNone(stars[0]._y_column)
+
+    def test_28_render_context_resolved_once(self):
+        """Контекст рендерингу збирається один раз і перебудовується лише після екіпірування чи зміни теми"""
+        ctx = self.game.get_render_context()
+        self.assertIs(self.game.get_render_context(), ctx)
+        self.assertEqual(ctx.basket_width, entities.Basket.BASE_WIDTH)
+        with patch.object(self.game, "get_equipped", wraps=self.game.get_equipped) as lookups:
+            star = entities.Star(1.0, self.game)
+            for _ in range(10): star.draw(MagicMock(), ctx)
+            lookups.assert_not_called()
+        with patch.object(self.game, "_save_data"): self.game.equip_item("size", 2)
+        self.assertEqual(self.game.get_render_context().basket_width, entities.Basket.BASE_WIDTH + 60)
+        engine.theme_mgr.current_theme = "light"
+        self.assertEqual(self.game.get_render_context().theme, "light")
+
+    def test_29_fixed_timestep_and_interpolation(self):
+        """Симуляція йде фіксованими тиками: швидкість не залежить від частоти кадрів, рендер інтерполює"""
+        game = main.Game(headless=True, tick_rate=60)
+        game._current_state = MagicMock()
+        self.assertEqual(game.advance(1 / 30), 2)              # кадр 30 FPS = два тики
+        self.assertEqual(game._current_state.update.call_count, 2)
+        self.assertEqual(game.advance(1 / 120), 0)             # пів тику лишається в акумуляторі
+        self.assertAlmostEqual(game.get_interpolation_alpha(), 0.5, places=5)
+        game._current_state = MagicMock(interpolated=False); game.advance(1 / 240)   # пауза: гра заморожена на останньому тику
+        self.assertFalse(states.PausedState.interpolated); self.assertEqual(game.get_interpolation_alpha(), 1.0)
+        fast, slow = entities.Star(1.0, self.game), entities.Star(1.0, self.game)
+        slow._base_speed = fast._base_speed; slow.set_y(0); fast.set_y(0)
+        fast.update(1 / 60); fast.update(1 / 60); slow.update(1 / 30)
+        self.assertAlmostEqual(fast.get_y(), slow.get_y(), places=5)
+        self.assertAlmostEqual(slow.get_draw_pos(0.5)[1], slow.get_y() / 2, places=5)
+
+    def test_30_headless_inputs_and_aggregate(self):
+        """Headless-прогін: скрипт клавіш, бот ведеться за найнижчою зіркою, гра без збереження на диск"""
+        script = simulate.ScriptedInput([(0, [mock_pygame.K_RIGHT]), (2, [])])
+        self.assertEqual([script(None)[mock_pygame.K_RIGHT] for _ in range(3)], [True, True, False])
+        state = MagicMock()
+        state._basket.get_rect.return_value = MagicMock(bottom=720, centerx=100)
+        low, high = MagicMock(), MagicMock()
+        low.get_y.return_value = 600; high.get_y.return_value = 100
+        low.get_rect.return_value = MagicMock(centerx=400)
+        state._star_manager.__iter__.return_value = iter([high, low])
+        keys = simulate.BotInput(seed=1, reaction=1.0, jitter=0)(state)
+        self.assertTrue(keys[mock_pygame.K_RIGHT]); self.assertFalse(keys[mock_pygame.K_LEFT])
+        sandbox = main.Game(headless=True, persistent=False)
+        with patch("builtins.open") as open_mock:
+            sandbox.add_currency(5); open_mock.assert_not_called()
+        stats = simulate.aggregate([{"survival": s, "score": s * 10, "game_over": s < 30, "miss_rate": 0.1} for s in (10, 20, 30, 40)])
+        self.assertEqual(stats["sessions"], 4); self.assertEqual(stats["game_over_rate"], 0.5); self.assertEqual(stats["score_max"], 400)
+
+    def test_31_replay_file_roundtrip(self):
+        """Реплей: зміни клавіш дельта-кодуються фоновим записувачем, індекс і підсумок читаються назад"""
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "session.rtrp")
+        script = simulate.ScriptedInput([(0, [mock_pygame.K_LEFT]), (3, []), (300, [mock_pygame.K_RIGHT])])
+        state = MagicMock(_score=0)
+        recorder = replay.ReplayRecorder(script, replay.ReplayWriter(path, {"seed": 42, "tick_rate": 60}), checkpoint_seconds=2, tick_rate=60)
+        for tick in range(400): state._score = tick // 10; recorder(state)
+        recorder.stop().wait(5)
+        loaded = replay.Replay.load(path)
+        self.assertEqual(loaded.header["seed"], 42)
+        self.assertEqual(loaded.changes, [(0, 1), (3, 0), (300, 2)])
+        self.assertEqual(loaded.checkpoints, [(0, 0), (120, 12), (240, 24), (360, 36)])
+        self.assertEqual((loaded.final_tick, loaded.final_score), (400, 39))
+        self.assertLess(os.path.getsize(path), 150)
+        receiver = MagicMock(mask=0); cmd = events.SetKeysCommand(receiver, 2)
+        cmd.execute(); self.assertEqual(receiver.mask, 2); cmd.undo(); self.assertEqual(receiver.mask, 0)
+        with patch.object(main.event_bus, "notify") as notify:   # тема реплею вмикається з подією, щоб кеші рендеру її підхопили
+            self.game.set_theme("light"); self.game.set_theme("light")
+            notify.assert_called_once_with("theme_switched", {"theme": "light"})
+        self.assertEqual(engine.theme_mgr.current_theme, "light"); self.assertFalse(engine.theme_mgr.is_transitioning)
+
+    def test_32_frame_profiler_ring_buffer(self):
+        """Профайлер: прихований нічого не міряє, показаний пише фази у кільцевий буфер фіксованого розміру"""
+        prof = profiler.FrameProfiler(capacity=4)
+        self.assertIsNone(prof.begin())
+        prof.toggle()
+        for _ in range(6):
+            frame = prof.begin()
+            for phase in profiler.PHASES: frame.lap(phase)
+            frame.end()
+        history = prof.history()
+        self.assertEqual(history.shape, (4, len(profiler.PHASES))); self.assertTrue((history >= 0).all())
+        class Star: pass
+        class Coin: pass
+        manager = engine.ObjectManager(); star, coin = Star(), Coin()
+        for obj in (star, coin): manager.add(obj)
+        manager.remove(star)
+        self.assertEqual(manager.count_by_type(), {"Coin": 1})
+
+    def test_33_metrics_histograms_and_kill_switch(self):
+        """Метрики: виклики агрегуються в гістограму (без логування кожного), вимикач повністю зупиняє запис"""
+        @metrics.timed("test.work")
+        def work(x): return x * 2
+        metrics.histogram("test.work").reset()
+        self.assertEqual([work(i) for i in range(10)], list(range(0, 20, 2)))
+        with metrics.span("test.work"): pass
+        hist = metrics.histogram("test.work"); stats = hist.summary()
+        self.assertEqual(stats["count"], 11); self.assertLessEqual(stats["min_ms"], stats["p50_ms"]); self.assertLessEqual(stats["p99_ms"], stats["max_ms"])
+        for ms in range(1, 101): hist.add(ms / 1000)
+        self.assertAlmostEqual(hist.percentile(0.5) * 1000, 50, delta=12)
+        metrics.set_enabled(False)
+        try:
+            work(1)
+            with metrics.span("test.work"): pass
+        finally: metrics.set_enabled(True)
+        self.assertEqual(hist.summary()["count"], 111)
+
+    def test_34_log_rate_limit_per_call_site(self):
+        """Логування: повтори з одного місця виклику обрізаються, наступний пропущений запис повідомляє скільки відкинуто"""
+        import logging
+        now = [100.0]; limiter = gamelog.RateLimitFilter(burst=3, interval=10.0, clock=lambda: now[0])
+        def record(line, msg="listener error"): return logging.LogRecord("root", logging.WARNING, "events.py", line, msg, None, None)
+        self.assertEqual([limiter.filter(record(51)) for _ in range(5)], [True, True, True, False, False])
+        self.assertTrue(limiter.filter(record(52)))
+        now[0] = 111.0; late = record(51); self.assertTrue(limiter.filter(late))
+        self.assertEqual(late.getMessage(), "listener error (2 similar messages suppressed)")
+
+    def test_35_write_behind_save_coalesces(self):
+        """Збереження: зміни лише позначаються, фоновий потік зливає їх в один атомарний запис, stop() дописує решту"""
+        import tempfile, json
+        path = os.path.join(tempfile.mkdtemp(), "save.json")
+        store = persistence.WriteBehindStore(path, min_interval=60)
+        with patch("persistence.write_json_atomic") as write:
+            store.mark_dirty({"currency": 0})
+            for _ in range(50):
+                if write.call_count: break
+                __import__("time").sleep(0.01)
+            for coins in range(1, 101): store.mark_dirty({"currency": coins})
+            self.assertEqual(write.call_count, 1, "Поки триває інтервал, сотня змін не пише на диск")
+        self.assertTrue(store.flush())
+        with open(path) as f: self.assertEqual(json.load(f), {"currency": 100})
+        self.assertFalse(os.path.exists(path + ".tmp")); self.assertFalse(store.dirty())
+        with patch("persistence.write_json_atomic", side_effect=OSError("disk full")):
+            store.mark_dirty({"currency": 101}); self.assertFalse(store.flush())
+        self.assertTrue(store.dirty(), "Невдалий запис лишає знімок для повтору")
+        store.close()
+        with open(path) as f: self.assertEqual(json.load(f)["currency"], 101)
+        retrying = persistence.WriteBehindStore(path, min_interval=0.01)
+        with patch("persistence.write_json_atomic", side_effect=[OSError("disk full"), None]) as write:
+            retrying.mark_dirty({"currency": 102})
+            for _ in range(200):
+                if write.call_count == 2: break
+                __import__("time").sleep(0.01)
+            self.assertEqual(write.call_count, 2, "Фоновий потік сам повторює невдалий запис"); self.assertFalse(retrying.dirty())
+        retrying.close()
+
+    def test_36_session_autosave_memento(self):
+        """Автозбереження: знімок ділить song_data за посиланням, компактно серіалізується, clear() видаляє файл один раз"""
+        import tempfile, json
+        song = {"name": "Twinkle", "bpm": 100, "note_id": "1"}
+        memento = events.GameMemento(40, 0, 1, 12.3456, "rhythm", song, note_index=7, speed=5.0, basket_x=175.25,
+                                     entities=(("s", 83, 440.04, "f4"), ("c", 120.0, 15.5, None)))
+        self.assertIs(memento.song, song)
+        data = memento.to_dict()
+        self.assertEqual(data["objs"], [["s", 83, 440.0, "f4"], ["c", 120.0, 15.5]])
+        restored = events.GameMemento.from_dict(json.loads(json.dumps(data)))
+        self.assertEqual((restored.note_index, restored.basket_x, restored.elapsed), (7, 175.2, 12.346))
+        self.assertEqual(restored.entities[1], ("c", 120.0, 15.5, None))
+        self.assertEqual(events.GameMemento.from_dict({"score": 5, "combo": 1, "missed": 0, "elapsed": 0.0, "mode": "endless"}).entities, ())
+        caretaker = events.MementoCaretaker(os.path.join(tempfile.mkdtemp(), "session.json"))
+        caretaker.autosave(memento); self.assertTrue(caretaker.flush()); self.assertTrue(os.path.exists(caretaker._filepath))
+        with patch.object(caretaker._store, "delete", wraps=caretaker._store.delete) as delete:
+            caretaker.clear(); caretaker.clear(); caretaker.clear()
+            self.assertEqual(delete.call_count, 1, "Повторні переходи в меню не чіпають диск")
+        caretaker.flush(); self.assertFalse(os.path.exists(caretaker._filepath))
+        sandbox = main.Game(headless=True, persistent=False); play = states.PlayingState(sandbox)
+        with patch.object(main.session_caretaker, "save") as save:
+            states.PausedState(sandbox, play); self.assertEqual(save.call_count, 0, "Пісочниця (симуляції, реплеї) не пише сесію гравця")
+            states.PausedState(self.game, states.PlayingState(self.game)); self.assertEqual(save.call_count, 1)
+
+    def test_37_note_bank_lazy_lru(self):
+        """Ноти: старт лише індексує файли, пісня вантажиться пулом потоків, банк тримає LRU в межах бюджету"""
+        import tempfile
+        folder = tempfile.mkdtemp()
+        for name in ("a-3", "c4", "d4", "e4"): open(os.path.join(folder, name + ".ogg"), "w").close()
+        loads = []
+        def loader(path): loads.append(os.path.basename(path)); return MagicMock(get_length=MagicMock(return_value=1.0))
+        with patch.object(soundbank.pygame.mixer, "get_init", return_value=(1000, -16, 2)):   # 1 s = 4000 bytes
+            bank = soundbank.NoteBank(budget_bytes=10000, loader=loader)
+            self.assertIsNone(bank.get("c4"), "До scan() банк порожній і нічого не вантажить")
+            self.assertEqual(bank.scan(folder), 4); self.assertEqual(loads, [])
+            self.assertEqual(bank.preload(["a#3", "c4", "c4", "zz"]).result(5), 2)
+            self.assertIs(bank.get("a#3"), bank.get("a-3")); self.assertEqual(bank.memory_bytes(), 8000)
+            bank.get("a#3"); bank.preload(["d4"]).result(5)
+            self.assertIn("a#3", bank); self.assertNotIn("c4", bank, "Найдавніше використана нота витісняється")
+            self.assertLessEqual(bank.memory_bytes(), 10000)
+            self.assertIsNone(bank.get("e4")); bank.preload(["e4"]).result(5); self.assertIn("e4", bank)
+        self.assertEqual(sorted(loads), ["a-3.ogg", "c4.ogg", "d4.ogg", "e4.ogg"])
+
+    def test_38_asset_pack_mmap(self):
+        """Пак PCM: збірка декодує один раз, читання йде зрізами mmap, змінене джерело інвалідує свій запис"""
+        import tempfile
+        folder = tempfile.mkdtemp(); path = os.path.join(folder, "sounds.pcmpack"); fmt = (44100, -16, 2)
+        for name, data in (("c4", b"one"), ("d4", b"two"), ("hight", b"fx")):
+            with open(os.path.join(folder, name + (".mp3" if name == "hight" else ".ogg")), "wb") as f: f.write(data)
+        decoded = []
+        def sound(path=None, buffer=None):
+            if buffer is not None: return bytes(buffer)
+            decoded.append(os.path.basename(path)); return MagicMock(get_raw=MagicMock(return_value=open(path, "rb").read() * 100))
+        with patch.object(assetpack.pygame.mixer, "get_init", return_value=fmt), patch.object(assetpack.pygame.mixer, "Sound", sound):
+            self.assertEqual(assetpack.build_pack(folder, path)["decoded"], 3)
+            pack = assetpack.AssetPack.open(path, folder)
+            self.assertEqual(len(pack), 3)
+            self.assertIsInstance(pack.raw("d4"), memoryview); self.assertEqual(pack.sound("d4"), b"two" * 100)
+            pack.close()
+            self.assertIsNone(assetpack.AssetPack.open(path, folder, (22050, -16, 2)), "Пак іншого формату мікшера ігнорується")
+            with open(os.path.join(folder, "c4.ogg"), "wb") as f: f.write(b"ONE!")
+            pack = assetpack.AssetPack.open(path, folder)
+            self.assertNotIn("c4", pack, "Змінене джерело більше не береться з паку"); self.assertIn("d4", pack); pack.close()
+            decoded.clear(); stats = assetpack.build_pack(folder, path)
+            self.assertEqual((stats["decoded"], stats["reused"]), (1, 2)); self.assertEqual(decoded, ["c4.ogg"])
+            pack = assetpack.AssetPack.open(path, folder); self.assertEqual(bytes(pack.raw("c4")), b"ONE!" * 100); pack.close()
+            with open(os.path.join(folder, "d4.ogg"), "wb") as f: f.write(b"TWO!")
+            with patch.object(assetpack.pygame.mixer, "Sound", side_effect=RuntimeError("decoder")):
+                self.assertRaises(RuntimeError, assetpack.build_pack, folder, path)
+            self.assertFalse(os.path.exists(path + ".tmp"), "Невдала збірка не лишає тимчасового файлу")
+            pack = assetpack.AssetPack.open(path, folder); self.assertIn("c4", pack, "Старий пак лишається цілим"); pack.close()
+            with open(path, "r+b") as f: f.seek(assetpack._HEADER.size - 12); f.write(bytes(8))   # зсув індексу вказує на заголовок
+            self.assertIsNone(assetpack.AssetPack.open(path, folder))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -10,10 +10,10 @@ Structural  : Facade, Composite
 Creational  : Builder
 """
 
-import copy
 import json
 import logging
 from abc import ABC, abstractmethod
+from persistence import WriteBehindStore
 
 
 # =============================================================================
@@ -58,7 +58,7 @@ event_bus = EventManager()
 # =============================================================================
 # 2. COMMAND PATTERN (Behavioral)
 # Encapsulates actions as objects, enabling undo/redo and macro recording.
-# Used for: basket movement, score updates, state transitions.
+# Used for: basket movement, score updates, state transitions, input replay.
 # =============================================================================
 class Command(ABC):
     """Abstract command — every concrete command must implement execute/undo."""
@@ -103,6 +103,26 @@ class UpdateScoreCommand(Command):
         self._state._score -= self._points
 
 
+class SetKeysCommand(Command):
+    """
+    @class SetKeysCommand
+    @brief Sets the held-key bitmask of an input receiver (replay playback).
+    @details The receiver only needs a mutable .mask attribute. Undo restores
+             the mask that was held before.
+    """
+    def __init__(self, receiver, mask: int):
+        self._receiver = receiver
+        self._mask = mask
+        self._previous = None
+
+    def execute(self) -> None:
+        self._previous = self._receiver.mask
+        self._receiver.mask = self._mask
+
+    def undo(self) -> None:
+        self._receiver.mask = self._previous
+
+
 class CommandHistory:
     """
     @class CommandHistory
@@ -172,21 +192,33 @@ class GameLoopTemplate(ABC):
 class GameMemento:
     """
     @class GameMemento
-    @brief Snapshot of a game session's serialisable state.
-    @details Stores score, combo, missed count, and elapsed time.
-             Created by the Originator (PlayingState/RhythmGameState)
-             and held by the Caretaker (Game).
+    @brief Immutable snapshot of a game session.
+    @details Stores score, combo, missed count, elapsed time, the rhythm note
+             index, the speed, the basket position and every live falling
+             object as a (kind, x, y, note) tuple. Created by the Originator
+             (PlayingState/RhythmGameState.create_memento) and held by the
+             Caretaker. Nothing is deep-copied: song_data is shared by
+             reference with the state (and with every other snapshot of the
+             session) and the entity list is a tuple of tuples, so a memento
+             can be handed to the writer thread as is.
     """
+    VERSION = 2
+
     def __init__(self, score: int, combo: int, missed: int, elapsed: float,
-                 mode: str, song_data: dict | None = None):
+                 mode: str, song_data: dict | None = None, note_index: int = 0,
+                 speed: float = 1.0, basket_x: float | None = None, entities: tuple = ()):
         self._score   = score
         self._combo   = combo
         self._missed  = missed
         self._elapsed = elapsed
         self._mode    = mode
-        self._song    = copy.deepcopy(song_data)
+        self._song    = song_data
+        self._note_index = note_index
+        self._speed   = speed
+        self._basket_x = basket_x
+        self._entities = entities
 
-    # Read-only access — callers must not mutate the snapshot
+    # Read-only access — callers must not mutate the snapshot (song is shared, not copied)
     @property
     def score(self)   -> int:   return self._score
     @property
@@ -198,17 +230,31 @@ class GameMemento:
     @property
     def mode(self)    -> str:   return self._mode
     @property
-    def song(self)    -> dict | None: return copy.deepcopy(self._song)
+    def song(self)    -> dict | None: return self._song
+    @property
+    def note_index(self) -> int: return self._note_index
+    @property
+    def speed(self)   -> float: return self._speed
+    @property
+    def basket_x(self) -> float | None: return self._basket_x
+    @property
+    def entities(self) -> tuple: return self._entities
 
     def to_dict(self) -> dict:
-        return {"score": self._score, "combo": self._combo,
-                "missed": self._missed, "elapsed": self._elapsed,
-                "mode": self._mode, "song": self._song}
+        """Compact form: positions rounded to 0.1 px, objects as [kind, x, y(, note)] lists."""
+        return {"v": self.VERSION, "score": self._score, "combo": self._combo,
+                "missed": self._missed, "elapsed": round(self._elapsed, 3),
+                "mode": self._mode, "song": self._song, "note": self._note_index,
+                "speed": round(self._speed, 4), "basket": None if self._basket_x is None else round(self._basket_x, 1),
+                "objs": [[kind, round(x, 1), round(y, 1)] + ([note] if note else []) for kind, x, y, note in self._entities]}
 
     @staticmethod
     def from_dict(d: dict) -> "GameMemento":
+        # Version 1 files (score/combo/missed/elapsed/mode/song only) load with defaults
+        entities = tuple((o[0], o[1], o[2], o[3] if len(o) > 3 else None) for o in d.get("objs", ()))
         return GameMemento(d["score"], d["combo"], d["missed"],
-                           d["elapsed"], d["mode"], d.get("song"))
+                           d["elapsed"], d["mode"], d.get("song"), d.get("note", 0),
+                           d.get("speed", 1.0), d.get("basket"), entities)
 
 
 class MementoCaretaker:
@@ -216,19 +262,30 @@ class MementoCaretaker:
     @class MementoCaretaker
     @brief Stores and persists GameMemento objects.
     @details Saves to / loads from a JSON file so progress survives restarts.
+             save() (pause) and autosave() (every AUTOSAVE_INTERVAL in play)
+             only keep the memento and queue it on a write-behind store; the
+             encoding and the file I/O happen on its writer thread. clear()
+             queues the deletion once and is a no-op until the next save.
     """
     def __init__(self, filepath: str = "session_save.json"):
         self._filepath = filepath
         self._memento: GameMemento | None = None
+        self._store = WriteBehindStore(filepath, min_interval=1.0, encode=GameMemento.to_dict)
+        self._cleared = False
 
     def save(self, memento: GameMemento) -> None:
-        self._memento = memento
-        try:
-            with open(self._filepath, "w", encoding="utf-8") as f:
-                json.dump(memento.to_dict(), f)
-            logging.info("MementoCaretaker: session saved.")
-        except OSError as e:
-            logging.error(f"MementoCaretaker: could not write save — {e}")
+        self.autosave(memento)
+        logging.info("MementoCaretaker: session saved.")
+
+    def autosave(self, memento: GameMemento) -> None:
+        self._memento = memento; self._cleared = False
+        self._store.mark_dirty(memento)
+
+    def last(self) -> GameMemento | None: return self._memento
+
+    def flush(self) -> bool:
+        """Writes (or deletes) the pending session file now; returns False on failure."""
+        return self._store.flush()
 
     def restore(self) -> GameMemento | None:
         if self._memento:
@@ -240,11 +297,9 @@ class MementoCaretaker:
             return None
 
     def clear(self) -> None:
-        self._memento = None
-        try:
-            import os; os.remove(self._filepath)
-        except OSError:
-            pass
+        if self._cleared: return
+        self._memento = None; self._cleared = True
+        self._store.delete()
 
 
 # Global caretaker used by Game class
@@ -0,0 +1,80 @@
+"""
+@file gamelog.py
+@brief Non-blocking logging setup for the Retinal game.
+@details Log calls on the game thread only put the record on a queue; a
+         background QueueListener formats it and writes it to the console
+         and to a size-rotated log file. A per-call-site rate limit drops
+         bursts of repeated messages (a listener failing every frame) before
+         they are queued and reports how many were dropped.
+         At exit the listener is drained and stopped and the real handlers
+         are attached directly, so messages logged during shutdown (the
+         metrics summary) are still written.
+"""
+
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import *
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    @class RateLimitFilter
+    @brief Lets at most burst records per call site through every interval seconds.
+    @details The call site (file, line) is the key, since messages are built
+             with f-strings and differ in their text. The first record let
+             through after a suppressed run carries the number dropped.
+             clock is injectable so tests need not patch time for every thread.
+    """
+    def __init__(self, burst: int = 5, interval: float = 10.0, clock=time.monotonic):
+        super().__init__(); self._burst = burst; self._interval = interval; self._clock = clock
+        self._sites = {}   # (pathname, lineno) -> [window start, passed in window, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = self._clock(); key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None: site = self._sites[key] = [now, 0, 0]
+        elif now - site[0] >= self._interval: site[0] = now; site[1] = 0
+        if site[1] >= self._burst: site[2] += 1; return False
+        site[1] += 1
+        if site[2]:
+            record.msg = f"{record.getMessage()} ({site[2]} similar messages suppressed)"; record.args = None; site[2] = 0
+        return True
+
+
+class _GameQueueHandler(QueueHandler):
+    # Only merges the message on the game thread; formatting (time stamp, traceback text) is left to the listener
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage(); record.args = None
+        return record
+
+
+_listener = None
+
+def setup_logging(path: str = LOG_FILE, level: int = logging.INFO, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                  console: bool = True, burst: int = 5, interval: float = 10.0) -> QueueListener:
+    """
+    @brief Routes the root logger through a queue to a rotating file (and the console).
+    @details Idempotent: later calls return the running listener unchanged.
+    """
+    global _listener
+    if _listener is not None: return _listener
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")]
+    if console: handlers.append(logging.StreamHandler())
+    for handler in handlers: handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue(); queue_handler = _GameQueueHandler(log_queue); queue_handler.addFilter(RateLimitFilter(burst, interval))
+    root = logging.getLogger(); root.setLevel(level)
+    for handler in root.handlers[:]: root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True); _listener.start()
+
+    def shutdown():
+        _listener.stop(); root.removeHandler(queue_handler)
+        for handler in handlers: root.addHandler(handler)
+    atexit.register(shutdown)
+    return _listener
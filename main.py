@@ -5,28 +5,45 @@ import logging
 import pygame
 import unittest
 import random
+import time
+import metrics
 from config import *
+from assetpack import AssetPack
 from engine import loc, theme_mgr, ObjectManager, measure_time
-from entities import ProceduralWave
-from events import audio, session_caretaker
-from states import MenuState, GameState, PlayingState, RhythmSelectionState, ShopState, SettingsState, GameOverState
+from entities import ProceduralWave, RenderContext, build_render_context
+from events import audio, session_caretaker, event_bus
+from render import static_layers, DirtyRectPresenter
+from gamelog import setup_logging
+from persistence import WriteBehindStore
+from profiler import FrameProfiler, PROFILER_KEY
+from soundbank import NoteBank
+from replay import start_recording
+from states import MenuState, GameState, PlayingState, RhythmSelectionState, ShopState, SettingsState, GameOverState, PausedState, RhythmGameState
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.FileHandler("game_log.log"), logging.StreamHandler()])
+setup_logging()   # queue-based: the game thread never writes the log file itself
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
 class Game:
-    def __init__(self, headless=False):
-        pygame.mixer.pre_init(44100, -16, 2, 512)
+    def __init__(self, headless=False, dirty_rects=False, tick_rate=TICK_RATE, persistent=True, record_dir=None):
+        # persistent=False sandboxes the game (simulations): no save file or session snapshot is read or written
+        # record_dir: every play session is recorded there as a replay file (see replay.py)
+        pygame.mixer.pre_init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
         if not pygame.get_init(): pygame.init()
         self._window = pygame.Surface((WIDTH, HEIGHT)) if headless else pygame.display.set_mode((WIDTH, HEIGHT))
         if not headless: pygame.display.set_caption("Retinal")
             
         self._clock = pygame.time.Clock(); self._running = True
+        self._headless = headless; self._persistent = persistent; self._input = None; self._record_dir = record_dir; self._recorder = None
+        self._tick = 1.0 / tick_rate; self._accumulator = 0.0; self._alpha = 1.0
+        self._dirty_rects = dirty_rects; self._presenter = DirtyRectPresenter((WIDTH, HEIGHT)); self._presented_state = None
+        self._profiler = FrameProfiler()
         self._settings = {"star_rate": 100, "star_rate_name": "Normal"}; self.sfx_volume = 0.5
         self.data = { "high_score": 0, "currency": 0, "inventory": ["Default", "Star", "Default_Size"], "equipped": {"color": "Default", "shape": "Star", "size": 0} }
-        self.notes_data = {}; self.sound_bank = {}
+        self.notes_data = {}; self.sound_bank = NoteBank(); self._asset_pack = None; self._render_ctx = None
+        self._saves = WriteBehindStore(SAVE_FILE)   # save_data.json is written off the game thread
 
-        self._load_data(); self._load_notes()
+        if persistent: self._load_data()
+        self._load_notes()
 
         self._load_fonts(); self._create_background()
         self._menu_music_path = os.path.join(SOUND_FOLDER, "menu_sound.mp3")
@@ -36,7 +53,8 @@ class Game:
         self._current_music_path = None; self._catch_sound = None; self._sound_channel_star = None
         
         if not headless:
-            self._load_audio(); self._load_all_note_sounds()
+            self._asset_pack = AssetPack.open(PACK_FILE, SOUND_FOLDER)   # None when not built (or built for another mixer format)
+            self._load_audio(); self._index_note_sounds()
             self._current_state = MenuState(self); self.play_music(self._menu_music_path, volume=0.5)
         else: self._current_state = None 
 
@@ -55,9 +73,17 @@ class Game:
         except Exception: self.notes_data = {}
 
     def _save_data(self):
-        try:
-            with open(SAVE_FILE, 'w') as f: json.dump(self.data, f)
-        except Exception as e: logging.error(f"Error saving data: {e}")
+        # No I/O here: hands a copy to the write-behind store, which coalesces and writes it atomically
+        if not self._persistent: return
+        self._saves.mark_dirty({**self.data, "inventory": list(self.data["inventory"]), "equipped": dict(self.data["equipped"])})
+
+    def autosave_session(self, memento):
+        # Called by the play states every AUTOSAVE_INTERVAL; the caretaker encodes and writes it off the game thread
+        if self._persistent: session_caretaker.autosave(memento)
+
+    def save_session(self, memento):
+        # Called on pause; like autosave_session, never from a sandboxed (persistent=False) game
+        if self._persistent: session_caretaker.save(memento)
 
     def update_high_score(self, score):
         if score > self.data["high_score"]: self.data["high_score"] = score; self._save_data()
@@ -69,9 +95,13 @@ class Game:
         if self.data["currency"] >= price:
             self.data["currency"] -= price; self.data["inventory"].append(item_id); self._save_data(); return True
         return False
-    def equip_item(self, category, item_id): self.data["equipped"][category] = item_id; self._save_data()
+    def equip_item(self, category, item_id): self.data["equipped"][category] = item_id; self._render_ctx = None; self._save_data()
     def is_equipped(self, category, item_id): return self.data["equipped"].get(category) == item_id
     def get_equipped(self, category): return self.data["equipped"].get(category)
+    def get_render_context(self) -> RenderContext:
+        # Rebuilt only after an equip or a theme switch; entities read it as plain attributes
+        if self._render_ctx is None or self._render_ctx.theme != theme_mgr.current_theme: self._render_ctx = build_render_context(self)
+        return self._render_ctx
 
     def _load_fonts(self):
         target_font = FONT_FILE_UA if loc.current_lang == "UA" else FONT_FILE_EN
@@ -93,26 +123,33 @@ class Game:
         light_count = len(theme_mgr.themes["light"]["bg_elements"])
         for i in range(max(dark_count, light_count)): self._waves_manager.add(ProceduralWave(i))
         self._bg_stars = [{'pos': (random.randint(0, WIDTH), random.randint(0, HEIGHT)), 'radius': random.randint(1, 2)} for _ in range(NUM_BG_STARS)]
+        static_layers.register("background", self._build_background_layer)
+
+    def _build_background_layer(self, theme):
+        layer = pygame.Surface((WIDTH, HEIGHT)); layer.fill(theme_mgr.themes[theme]["bg_color"])
+        if theme_mgr.themes[theme]["has_bg_stars"]:
+            for star in self._bg_stars: pygame.draw.circle(layer, WHITE, star['pos'], star['radius'])
+        return layer
 
     def _load_audio(self):
         try:
             hight_path = self._sound_effect_paths.get("hight")
-            if hight_path and os.path.exists(hight_path):
+            if self._asset_pack and "hight" in self._asset_pack:
+                 self._catch_sound = self._asset_pack.sound("hight"); self._sound_channel_star = pygame.mixer.Channel(0)
+            elif hight_path and os.path.exists(hight_path):
                  self._catch_sound = pygame.mixer.Sound(hight_path); self._sound_channel_star = pygame.mixer.Channel(0)
             else: self._catch_sound = None; self._sound_channel_star = None
         except: self._catch_sound = None; self._sound_channel_star = None
 
     @measure_time
-    def _load_all_note_sounds(self):
-        if not os.path.exists(SOUND_FOLDER): return
-        for filename in os.listdir(SOUND_FOLDER):
-            if filename.endswith(".ogg"):
-                note_name = os.path.splitext(filename)[0]
-                try:
-                    sound = pygame.mixer.Sound(os.path.join(SOUND_FOLDER, filename))
-                    self.sound_bank[note_name] = sound
-                    if '-' in note_name: self.sound_bank[note_name.replace('-', '#')] = sound
-                except Exception: pass
+    def _index_note_sounds(self):
+        # Nothing is decoded here: notes are loaded per song (load_song_notes) into an LRU bounded by NOTE_BANK_BUDGET_MB,
+        # from the mapped asset pack when it has them
+        self.sound_bank.scan(SOUND_FOLDER, self._asset_pack)
+
+    def load_song_notes(self, song):
+        """Decodes the song's note set on the loader pool; returns a future done when all are in memory."""
+        return self.sound_bank.preload(self.notes_data.get(song["note_id"], []))
 
     def play_note_sound(self, note_name):
         sound = self.sound_bank.get(note_name)
@@ -122,6 +159,7 @@ class Game:
         if self._sound_channel_star and self._catch_sound: self._catch_sound.set_volume(self.sfx_volume); self._sound_channel_star.play(self._catch_sound)
 
     def play_music(self, music_path: str, fade_ms: int = 1000, volume: float = 0.5):
+        if self._headless: return
         # FACADE PATTERN — delegates to AudioFacade instead of calling pygame.mixer directly
         if not os.path.exists(music_path): self._current_music_path = None; return
         if music_path == self._current_music_path and pygame.mixer.music.get_busy():
@@ -130,34 +168,107 @@ class Game:
         self._current_music_path = music_path
 
     def run(self):
-        while self._running:
-            dt = self._clock.tick(FPS) / 1000.0
-            switched = theme_mgr.update()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT: self.stop()
-                self._current_state.handle_event(event)
-            self._waves_manager.update_all(dt, theme_switched=switched)
-            self._current_state.update(dt)
-            self._window.fill(theme_mgr.get("bg_color"))
-            if theme_mgr.get("has_bg_stars"):
-                for star in self._bg_stars: pygame.draw.circle(self._window, WHITE, star['pos'], star['radius'])
-            self._waves_manager.draw_all(self._window)
-            self._current_state.draw(self._window)
-            theme_mgr.draw_transition(self._window)
-            pygame.display.flip()
+        try:
+            while self._running: self.run_frame(min(self._clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)); metrics.poll()
+        finally:
+            if self._recorder: self._recorder.stop().wait()   # the writer thread is not a daemon: always let it finish
+        if self._dirty_rects: logging.info(f"Dirty rects: {self.get_dirty_rect_stats()}")
         pygame.quit()
 
+    def run_frame(self, dt):
+        """One pass of the main loop: theme, events, background, simulation ticks, draw and present."""
+        prof = self._profiler.begin()   # None unless the profiler overlay is shown
+        switched = theme_mgr.update()
+        if switched: event_bus.notify("theme_switched", {"theme": theme_mgr.current_theme})
+        if prof: prof.lap("theme")
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: self.stop()
+            if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY: self._profiler.toggle(); continue
+            self._current_state.handle_event(event)
+        if prof: prof.lap("events")
+        self._waves_manager.update_all(dt, theme_switched=switched)
+        if prof: prof.lap("waves")
+        self.advance(dt)
+        if prof: prof.lap("update")
+        wave_rects, state_rects = self.draw_frame(prof)
+        if prof:
+            rect = prof.draw(self._window, self.get_object_managers())
+            if state_rects is not None: state_rects = state_rects + [rect]
+        self._present(wave_rects, state_rects)
+        if prof: prof.lap("flip"); prof.end()
+
+    def draw_frame(self, prof=None):
+        """Composes one frame into the window; returns (wave_rects, state_rects) for _present."""
+        static_layers.draw(self._window, "background", theme_mgr.current_theme)
+        wave_rects = self._waves_manager.draw_all(self._window)
+        if prof: prof.lap("background")
+        state_rects = self._current_state.draw(self._window)
+        if prof: prof.lap("state draw")
+        theme_mgr.draw_transition(self._window)
+        if prof: prof.lap("transition")
+        return wave_rects, state_rects
+
+    def render_frame(self):
+        """Draws and presents one frame without stepping the simulation (replay viewer)."""
+        self._present(*self.draw_frame())
+
+    def set_theme(self, theme):
+        """Instant theme switch (replays): notifies like the end of a transition, so render caches and waves follow."""
+        if theme_mgr.set_theme(theme): event_bus.notify("theme_switched", {"theme": theme}); self._waves_manager.update_all(0.0, theme_switched=True)
+
+    def get_object_managers(self) -> dict:
+        """The background's and the current state's ObjectManagers, by name (profiler overlay)."""
+        managers = {"waves": self._waves_manager}
+        for name, value in vars(self._current_state).items():
+            if isinstance(value, ObjectManager): managers[name.strip("_")] = value
+        return managers
+
+    def advance(self, dt) -> int:
+        """Runs as many fixed simulation ticks as dt covers; the remainder sets the render interpolation."""
+        self._accumulator += dt; ticks = 0
+        while self._accumulator >= self._tick:
+            self._current_state.update(self._tick); self._accumulator -= self._tick; ticks += 1
+        self._alpha = self._accumulator / self._tick
+        return ticks
+    def step(self): self._current_state.update(self._tick)   # one simulation tick, no rendering (headless runs)
+    def get_state(self) -> GameState: return self._current_state
+    def get_tick_rate(self) -> int: return round(1 / self._tick)
+    def get_interpolation_alpha(self) -> float: return self._alpha if getattr(self._current_state, "interpolated", True) else 1.0
+    def set_input(self, source): self._input = source
+    def get_keys(self):
+        """Pressed-key map for the play states: the keyboard, or an input source called with the current state (bots, replays)."""
+        return self._input(self._current_state) if self._input else pygame.key.get_pressed()
+
+    def _present(self, wave_rects, state_rects):
+        if not self._dirty_rects: pygame.display.flip(); return
+        force_full = theme_mgr.is_transitioning or self._current_state is not self._presented_state
+        self._presented_state = self._current_state
+        self._presenter.present(wave_rects + state_rects if state_rects is not None else None, force_full, theme_mgr.get("full_screen_scenery"))
+
+    def set_dirty_rects(self, enabled: bool): self._dirty_rects = enabled; self._presented_state = None
+    def get_dirty_rect_stats(self) -> dict: return self._presenter.stats()
+
     def change_state(self, new_state: GameState):
         self._current_state = new_state
+        if self._record_dir: self._track_recording(new_state)
         # MEMENTO — clear saved session when returning to menu or game over
-        if isinstance(new_state, (MenuState, GameOverState)):
+        if isinstance(new_state, (MenuState, GameOverState)) and self._persistent:
             session_caretaker.clear()
         if isinstance(new_state, (MenuState, SettingsState, GameOverState, RhythmSelectionState, ShopState)):
             self.play_music(self._menu_music_path, volume=audio._music_volume)
         elif isinstance(new_state, PlayingState):
             self.play_music(self._game_music_path, volume=0.3)
 
-    def stop(self): self._running = False
+    def _track_recording(self, new_state):
+        # A recording spans one play state; pausing and resuming it keeps the same file
+        if self._recorder and not isinstance(new_state, PausedState) and new_state is not self._recorder_state:
+            self._recorder.stop(); self._recorder = None; self.set_input(None)
+        if self._recorder is None and isinstance(new_state, (PlayingState, RhythmGameState)):
+            os.makedirs(self._record_dir, exist_ok=True); mode = "rhythm" if isinstance(new_state, RhythmGameState) else "endless"
+            path = os.path.join(self._record_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{mode}.rtrp")
+            self._recorder = start_recording(self, new_state, path); self._recorder_state = new_state
+
+    def stop(self): self._running = False; self._saves.flush(); session_caretaker.flush()
     def get_settings(self) -> dict: return self._settings
 
 class TestRetinalSystems(unittest.TestCase):
@@ -174,6 +285,17 @@ class TestRetinalSystems(unittest.TestCase):
     def test_economy_buy_item_fail(self):
         self.game.data["currency"] = 10; result = self.game.buy_item("color", "ExpensiveGold", 500)
         self.assertFalse(result); self.assertEqual(self.game.get_currency(), 10); self.assertFalse(self.game.has_item("color", "ExpensiveGold"))
+    def test_dirty_rects_merge_overlapping(self):
+        from render import merge_rects
+        bounds = pygame.Rect(0, 0, WIDTH, HEIGHT)
+        merged = merge_rects([pygame.Rect(10, 10, 20, 20), pygame.Rect(25, 25, 20, 20), pygame.Rect(300, 300, 5, 5), pygame.Rect(-50, -50, 10, 10)], bounds)
+        self.assertEqual(sorted(map(tuple, merged)), [(10, 10, 35, 35), (300, 300, 5, 5)])
+    def test_replay_resimulates_identically(self):
+        import tempfile, replay, simulate; path = os.path.join(tempfile.mkdtemp(), "bot.rtrp"); game = Game(headless=True, persistent=False); state = PlayingState(game)
+        recorder = replay.start_recording(game, state, path, seed=5, source=simulate.BotInput(5, reaction=0.3, jitter=60)); game.change_state(state)
+        for _ in range(1800): game.step()
+        recorder.stop().wait(); player = replay.ReplayPlayer(game, replay.Replay.load(path)); player.seek(1800)
+        self.assertEqual(player.state._score, state._score); self.assertEqual(player.state._missed_stars, state._missed_stars)
     def test_highscore_update(self):
         self.game.data["high_score"] = 100; self.game.update_high_score(50); self.assertEqual(self.game.get_high_score(), 100)
         self.game.update_high_score(200); self.assertEqual(self.game.get_high_score(), 200)
@@ -181,4 +303,7 @@ class TestRetinalSystems(unittest.TestCase):
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         sys.argv.pop(1); unittest.main()
-    else: game = Game(); game.run()
\ No newline at end of file
+    else:
+        tick_rate = next((int(arg.split("=", 1)[1]) for arg in sys.argv if arg.startswith("--tick-rate=")), TICK_RATE)
+        record_dir = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--record=")), None)
+        game = Game(dirty_rects="--dirty-rects" in sys.argv, tick_rate=tick_rate, record_dir=record_dir); game.run()
\ No newline at end of file
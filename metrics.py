@@ -0,0 +1,167 @@
+"""
+@file metrics.py
+@brief Aggregated, low-overhead timing instrumentation for the Retinal game.
+@details Timings are not logged per call: each name owns a Histogram that
+         keeps count, total, min, max and log-spaced buckets (four per
+         octave, so percentiles are within ~20%). Recording is a list append;
+         samples are folded into the buckets in NumPy batches, so a timer is
+         cheap enough for per-frame and per-object code.
+         A summary table is logged every DUMP_INTERVAL seconds (Game.run
+         calls poll() once per frame) and at interpreter exit.
+         Kill switch: set_enabled(False), or RETINAL_METRICS=0 in the
+         environment; disabled timers only test one module flag.
+
+         Usage:
+             @timed                       # name = the function's qualname
+             def _handle_collisions(self): ...
+
+             with span("load notes"): ...
+"""
+
+import atexit
+import functools
+import logging
+import math
+import os
+import time
+import numpy as np
+
+DUMP_INTERVAL = 60.0   # seconds between periodic summaries
+
+_enabled = os.environ.get("RETINAL_METRICS", "1") != "0"
+_histograms = {}
+_next_dump = time.monotonic() + DUMP_INTERVAL
+
+
+def set_enabled(enabled: bool) -> None: global _enabled; _enabled = enabled
+def is_enabled() -> bool: return _enabled
+
+
+# =============================================================================
+# 1. HISTOGRAMS
+# =============================================================================
+class Histogram:
+    """
+    @class Histogram
+    @brief Fixed-size duration histogram with exact count/total/min/max.
+    @details add() only appends to a pending list; every FOLD_AT samples (and
+             before any read) the batch is folded into the buckets with NumPy.
+             Bucket i covers one quarter octave: frexp() splits a duration
+             into mantissa and exponent, so no log() is taken. Buckets span
+             ~30 ns to ~2 min; anything outside lands in the end buckets
+             while min and max stay exact.
+    """
+    SUB = 4; OFFSET = 24; SIZE = 32 * SUB
+    FOLD_AT = 4096
+
+    def __init__(self, name: str):
+        self.name = name; self.pending = []; self.reset()
+
+    def reset(self) -> None:
+        self.pending.clear(); self.buckets = np.zeros(self.SIZE, dtype=np.int64)
+        self.count = 0; self.total = 0.0; self.min = math.inf; self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.pending.append(seconds)
+        if len(self.pending) >= self.FOLD_AT: self.fold()
+
+    def fold(self) -> None:
+        if not self.pending: return
+        samples = np.array(self.pending, dtype=np.float64); self.pending.clear()
+        self.count += len(samples); self.total += float(samples.sum())
+        self.min = min(self.min, float(samples.min())); self.max = max(self.max, float(samples.max()))
+        m, e = np.frexp(samples)
+        index = np.where(samples > 0, (e + self.OFFSET) * self.SUB + ((m - 0.5) * 2 * self.SUB).astype(np.int64), 0)
+        self.buckets += np.bincount(np.clip(index, 0, self.SIZE - 1), minlength=self.SIZE)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th sample, clamped to [min, max]."""
+        self.fold()
+        if not self.count: return 0.0
+        i = int(np.searchsorted(np.cumsum(self.buckets), max(1.0, q * self.count)))
+        e, sub = divmod(i + 1, self.SUB)
+        return min(max(math.ldexp(0.5 + sub / (2 * self.SUB), e - self.OFFSET), self.min), self.max)
+
+    def summary(self) -> dict:
+        self.fold(); ms = 1000.0
+        return {"count": self.count, "total_ms": self.total * ms, "mean_ms": self.total / self.count * ms if self.count else 0.0,
+                "min_ms": self.min * ms if self.count else 0.0, "max_ms": self.max * ms,
+                "p50_ms": self.percentile(0.50) * ms, "p95_ms": self.percentile(0.95) * ms, "p99_ms": self.percentile(0.99) * ms}
+
+
+def histogram(name: str) -> Histogram:
+    hist = _histograms.get(name)
+    if hist is None: hist = _histograms[name] = Histogram(name)
+    return hist
+
+
+# =============================================================================
+# 2. TIMERS
+# =============================================================================
+def timed(name=None):
+    """Decorator recording every call's duration under name (default: the function's __qualname__). Usable bare or called."""
+    def decorate(func):
+        hist = histogram(name or func.__qualname__); pending = hist.pending; clock = time.perf_counter
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled: return func(*args, **kwargs)
+            start = clock()
+            try: return func(*args, **kwargs)
+            finally:
+                pending.append(clock() - start)
+                if len(pending) >= Histogram.FOLD_AT: hist.fold()
+        return wrapper
+    if callable(name): return timed()(name)
+    return decorate
+
+
+class span:
+    """Context manager recording the duration of its block under name."""
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, name: str): self._hist = histogram(name); self._start = None
+
+    def __enter__(self):
+        if _enabled: self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._start is not None: self._hist.add(time.perf_counter() - self._start)
+        return False
+
+
+# =============================================================================
+# 3. REPORTING
+# =============================================================================
+def summary() -> dict:
+    """{name: {count, total_ms, mean_ms, min_ms, max_ms, p50_ms, p95_ms, p99_ms}} for every name with samples."""
+    return {name: hist.summary() for name, hist in sorted(_histograms.items()) if hist.count}
+
+
+def reset() -> None:
+    for hist in _histograms.values(): hist.reset()
+
+
+def dump(reset_after: bool = False) -> None:
+    """Logs the summary table as a single INFO record (nothing if no samples)."""
+    rows = summary()
+    if not rows: return
+    width = max(len(name) for name in rows)
+    lines = ["Performance summary:", f"{'name':<{width}} {'count':>8} {'total':>10} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"]
+    for name, s in rows.items():
+        lines.append(f"{name:<{width}} {s['count']:>8} {s['total_ms']:>8.1f}ms {s['mean_ms']:>7.3f}ms {s['p50_ms']:>7.3f}ms "
+                     f"{s['p95_ms']:>7.3f}ms {s['p99_ms']:>7.3f}ms {s['max_ms']:>7.3f}ms")
+    logging.info("\n".join(lines))
+    if reset_after: reset()
+
+
+def poll(now: float = None) -> None:
+    """Call once per frame: logs and resets the summary every DUMP_INTERVAL seconds."""
+    global _next_dump
+    now = time.monotonic() if now is None else now
+    if now < _next_dump: return
+    _next_dump = now + DUMP_INTERVAL
+    if _enabled: dump(reset_after=True)
+
+
+atexit.register(dump)
@@ -0,0 +1,95 @@
+"""
+@file persistence.py
+@brief Write-behind, crash-safe JSON persistence for the Retinal game.
+@details The game thread only hands over a snapshot of the data (mark_dirty);
+         a background thread coalesces snapshots and writes the newest one at
+         most once every min_interval seconds. Every write goes to a temp file
+         in the same directory, is fsynced and then renamed over the target,
+         so after a crash or power loss the file holds either the previous or
+         the new save, never a torn one. Deletion goes through the same
+         queue, so it is ordered with the writes and also off the game thread.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+
+_DELETE = object()   # pending marker: remove the file instead of writing it
+
+
+def write_json_atomic(path: str, data) -> None:
+    """Writes data as compact JSON to path via temp file + fsync + rename (+ directory fsync on POSIX)."""
+    directory = os.path.dirname(os.path.abspath(path)); tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":")); f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if os.name == "posix":
+        fd = os.open(directory, os.O_RDONLY)
+        try: os.fsync(fd)   # makes the rename itself durable
+        finally: os.close(fd)
+
+
+class WriteBehindStore:
+    """
+    @class WriteBehindStore
+    @brief Coalescing background writer for one JSON file.
+    @details mark_dirty(snapshot) never touches the disk: it keeps the newest
+             snapshot and wakes the writer thread, which is started on the
+             first call. The first change is written at once, later ones at
+             most every min_interval seconds; a burst in between costs one
+             write. A failed write is logged and retried on the next round.
+             flush() writes the pending snapshot on the calling thread and is
+             also run at interpreter exit (the thread is a daemon).
+             snapshot must not be mutated afterwards: pass a copy or an
+             immutable object, plus an encode function that turns it into
+             JSON data (run on the writer thread).
+    """
+    def __init__(self, path: str, min_interval: float = 2.0, encode=None):
+        self._path = path; self._min_interval = min_interval; self._encode = encode
+        self._pending = None; self._lock = threading.Lock(); self._write_lock = threading.Lock()
+        self._wake = threading.Event(); self._thread = None; self._closed = False
+        self.writes = 0
+
+    def delete(self) -> None:
+        """Queues removal of the file; it replaces any snapshot still pending."""
+        self.mark_dirty(_DELETE)
+
+    def mark_dirty(self, snapshot) -> None:
+        with self._lock: self._pending = snapshot
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True); self._thread.start()
+            atexit.register(self.close)
+        self._wake.set()
+
+    def dirty(self) -> bool: return self._pending is not None
+
+    def flush(self) -> bool:
+        """Writes the pending snapshot now, if any; returns False when the write failed."""
+        with self._write_lock:
+            with self._lock: snapshot, self._pending = self._pending, None
+            if snapshot is None: return True
+            try:
+                if snapshot is _DELETE:
+                    if os.path.exists(self._path): os.remove(self._path)
+                    return True
+                write_json_atomic(self._path, self._encode(snapshot) if self._encode else snapshot); self.writes += 1; return True
+            except (OSError, TypeError, ValueError) as e:
+                logging.error(f"Error saving {self._path}: {e}")
+                with self._lock:
+                    if self._pending is None: self._pending = snapshot
+                return False
+
+    def close(self) -> None:
+        """Final flush; later mark_dirty() calls are written by flush() only."""
+        self._closed = True; self._wake.set(); self.flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(); self._wake.clear()
+            if self._closed: break
+            if not self.flush(): self._wake.set()   # retried after the interval even if nothing else changes
+            time.sleep(self._min_interval)   # changes made meanwhile are coalesced into the next write
@@ -0,0 +1,111 @@
+"""
+@file profiler.py
+@brief In-game frame profiler overlay for the Retinal game.
+@details Game.run_frame() times each phase of the main loop into a fixed-size
+         ring buffer and the overlay draws it as a scrolling stacked bar graph
+         with per-phase averages and live ObjectManager counts. While the
+         overlay is hidden begin() returns None and nothing is timed, so the
+         profiler costs one attribute test per phase and can stay in release
+         builds. Toggled with PROFILER_KEY (F3).
+"""
+
+import time
+import numpy as np
+import pygame
+from config import *
+
+PROFILER_KEY = pygame.K_F3
+
+# Main loop phases in execution order, with their bar colours
+PHASES = ("theme", "events", "waves", "update", "background", "state draw", "transition", "flip")
+PHASE_COLORS = ((170, 120, 220), (230, 150, 80), (90, 170, 230), (230, 90, 90),
+                (120, 200, 120), (240, 210, 90), (200, 200, 200), (80, 110, 200))
+
+
+class FrameProfiler:
+    """
+    @class FrameProfiler
+    @brief Per-phase frame timings in a ring buffer, drawn as a live overlay.
+    @details Usage per frame: prof = profiler.begin(); prof.lap("events") after
+             each phase; prof.end(). Rows are in milliseconds. The graph is a
+             persistent surface scrolled by one bar per frame, so drawing it
+             never re-plots the whole history; the legend text is re-rendered
+             every LEGEND_EVERY frames.
+    """
+    BAR_WIDTH = 2; GRAPH_HEIGHT = 90; MS_SCALE = 33.3   # graph top = MS_SCALE ms (two 60 FPS frames)
+    LEGEND_EVERY = 15; MARGIN = 6
+    BG_COLOR = (10, 10, 20, 200)
+
+    def __init__(self, capacity: int = 120):
+        self.visible = False
+        self._times = np.zeros((capacity, len(PHASES)), dtype=np.float32)
+        self._phase = {name: i for i, name in enumerate(PHASES)}
+        self._head = 0; self._count = 0; self._row = None; self._t = 0.0
+        self._graph = None; self._legend = None; self._panel = None; self._font = None; self._since_legend = 0
+
+    def toggle(self) -> None:
+        self.visible = not self.visible
+        self._count = 0; self._legend = None; self._graph = None
+
+    def begin(self):
+        """Starts timing a frame; returns None (skip all laps) while the overlay is hidden."""
+        if not self.visible: return None
+        self._row = self._times[self._head]; self._row[:] = 0; self._t = time.perf_counter()
+        return self
+
+    def lap(self, phase: str) -> None:
+        """Charges the time since the previous lap to phase."""
+        now = time.perf_counter(); self._row[self._phase[phase]] += (now - self._t) * 1000; self._t = now
+
+    def end(self) -> None:
+        if self._graph is not None: self._plot(self._row)
+        self._head = (self._head + 1) % len(self._times); self._count = min(self._count + 1, len(self._times))
+
+    def history(self) -> np.ndarray:
+        """Recorded rows, oldest first (ms per phase)."""
+        if self._count < len(self._times): return self._times[:self._count].copy()
+        return np.roll(self._times, -self._head, axis=0)
+
+    # -------------------------------------------------------------------------
+    def draw(self, surface, managers: dict) -> pygame.Rect:
+        """Blits the overlay in the top-left corner; its own cost is not charged to any phase."""
+        if self._graph is None: self._build()
+        self._since_legend += 1
+        if self._legend is None or self._since_legend >= self.LEGEND_EVERY: self._legend = self._render_legend(managers); self._since_legend = 0
+        x = y = self.MARGIN
+        panel = pygame.Rect(x, y, self._legend.get_width() + 2 * self.MARGIN, self.GRAPH_HEIGHT + self._legend.get_height() + 3 * self.MARGIN)
+        if self._panel is None or self._panel.get_size() != panel.size:
+            self._panel = pygame.Surface(panel.size, pygame.SRCALPHA); self._panel.fill(self.BG_COLOR)
+        surface.blit(self._panel, panel)
+        surface.blit(self._graph, (x + self.MARGIN, y + self.MARGIN))
+        surface.blit(self._legend, (x + self.MARGIN, y + 2 * self.MARGIN + self.GRAPH_HEIGHT))
+        self._t = time.perf_counter()
+        return panel
+
+    def _build(self) -> None:
+        self._font = self._font or pygame.font.Font(None, 18)
+        self._graph = pygame.Surface((len(self._times) * self.BAR_WIDTH, self.GRAPH_HEIGHT), pygame.SRCALPHA)
+        for row in self.history(): self._plot(row)
+
+    def _plot(self, row) -> None:
+        graph = self._graph; w = self.BAR_WIDTH; h = self.GRAPH_HEIGHT; x = graph.get_width() - w
+        graph.scroll(-w, 0); graph.fill((0, 0, 0, 0), (x, 0, w, h))
+        bottom = float(h); px_per_ms = h / self.MS_SCALE
+        for i, ms in enumerate(row):
+            top = max(0.0, bottom - ms * px_per_ms)
+            if int(bottom) > int(top): graph.fill(PHASE_COLORS[i], (x, int(top), w, int(bottom) - int(top)))
+            bottom = top
+        budget = int(h - 1000 / FPS * px_per_ms); graph.fill((255, 255, 255, 90), (x, budget, w, 1))
+
+    def _render_legend(self, managers: dict) -> pygame.Surface:
+        rows = self.history(); means = rows.mean(axis=0) if len(rows) else np.zeros(len(PHASES)); totals = rows.sum(axis=1) if len(rows) else [0.0]
+        lines = [((255, 255, 255), f"frame {float(np.mean(totals)):5.2f} ms  worst {float(np.max(totals)):5.2f} ms")]
+        lines += [(PHASE_COLORS[i], f"{name:<11}{float(means[i]):6.2f} ms") for i, name in enumerate(PHASES)]
+        for label, manager in managers.items():
+            by_type = ", ".join(f"{cls} {n}" for cls, n in manager.count_by_type().items())
+            lines.append(((200, 200, 200), f"{label}: {len(manager)}" + (f" ({by_type})" if by_type else "")))
+        rendered = [self._font.render(text, True, color) for color, text in lines]
+        legend = pygame.Surface((max(self._graph.get_width(), max(r.get_width() for r in rendered)), sum(r.get_height() for r in rendered)), pygame.SRCALPHA)
+        y = 0
+        for r in rendered: legend.blit(r, (0, y)); y += r.get_height()
+        return legend
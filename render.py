@@ -0,0 +1,348 @@
+"""
+@file render.py
+@brief Cached rendering helpers for the Retinal game.
+@details Pre-rendered surfaces that replace per-frame rasterization in the
+         hot draw paths. Everything here is built once (per theme or per
+         definition) and then only blitted.
+"""
+
+import math
+import pygame
+from collections import OrderedDict
+from config import *
+from events import GameEventListener, event_bus
+
+
+# =============================================================================
+# 1. WAVE STRIPS
+# A wave is periodic in phase, so one strip wider than the screen by a full
+# period holds every frame of its animation. Drawing is a sub-rect blit.
+# =============================================================================
+class WaveStrip:
+    """
+    @class WaveStrip
+    @brief Pre-rendered, horizontally periodic strip for one wave definition.
+    @details The strip covers x in [0, WIDTH + period] at phase 0. Shifting the
+             phase by d equals shifting x by d / freq, so the visible window is
+             Rect(offset, 0, WIDTH, h) with offset = (phase / freq) mod period.
+    """
+    def __init__(self, color, amp: float, freq: float, y_offset: float):
+        self._freq = freq
+        self._period = 2 * math.pi / freq
+        self._top = max(0, int(y_offset - amp) - 1)
+        height = HEIGHT - self._top
+        width = WIDTH + int(math.ceil(self._period)) + 1
+        self._surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        points = [(x, amp * math.sin(freq * x) + y_offset - self._top) for x in range(width + 1)]
+        points.extend([(width, height), (0, height)])
+        pygame.draw.polygon(self._surface, color, points)
+        self._area = pygame.Rect(0, 0, WIDTH, height)
+
+    def offset(self, phase: float) -> int:
+        """Returns the strip x coordinate that maps to screen x = 0."""
+        return int((phase / self._freq) % self._period)
+
+    def draw(self, surface, phase: float) -> pygame.Rect:
+        self._area.x = self.offset(phase)
+        return surface.blit(self._surface, (0, self._top), self._area)
+
+
+# =============================================================================
+# 2. SPRITE CACHES
+# Bounded LRU of pre-rendered surfaces. Caches that depend on the palette
+# subscribe to event_bus and drop their contents on "theme_switched".
+# =============================================================================
+class SpriteLRU:
+    """
+    @class SpriteLRU
+    @brief Bounded least-recently-used map from a key to a built sprite.
+    @details get() builds missing entries with the supplied factory and
+             evicts the oldest entry once max_entries is exceeded.
+    """
+    def __init__(self, max_entries: int):
+        self._max = max_entries
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key, build):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = build()
+            if len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self): return len(self._entries)
+
+
+class StarSprites(GameEventListener):
+    """
+    @class StarSprites
+    @brief Pre-rendered halo + core frames for a star's blink cycle.
+    @details A cycle of BLINK_FRAMES frames is built per (theme, quantized
+             size, base colour, halo colour, halo alpha, pulsing halo) key,
+             so drawing a star is a single blit of the nearest frame.
+    """
+    BLINK_FRAMES = 16
+
+    def __init__(self, max_cycles: int = 64):
+        self._cycles = SpriteLRU(max_cycles)
+
+    def on_event(self, event_type: str, data: dict) -> None:
+        if event_type == "theme_switched": self._cycles.clear()
+
+    def frame(self, theme, base_size, base_color, halo_color, halo_alpha, pulse_halo, p):
+        """Returns (surface, half_extent) for blink phase p in [0, 1]."""
+        size = round(base_size * 2) / 2
+        key = (theme, size, base_color, halo_color, halo_alpha, pulse_halo)
+        cycle = self._cycles.get(key, lambda: self._build_cycle(size, base_color, halo_color, halo_alpha, pulse_halo))
+        return cycle[int(p * (self.BLINK_FRAMES - 1) + 0.5)]
+
+    def _build_cycle(self, base_size, base_color, halo_color, halo_alpha, pulse_halo):
+        cycle = []
+        for i in range(self.BLINK_FRAMES):
+            p = i / (self.BLINK_FRAMES - 1); size = base_size * (0.8 + p * 0.4)
+            alpha = int(halo_alpha * (0.7 + p * 0.3)) if pulse_halo else halo_alpha
+            s = pygame.Surface((int(size*4), int(size*4)), pygame.SRCALPHA); center = (int(size*2), int(size*2))
+            pygame.draw.circle(s, (*halo_color, alpha), center, int(size*1.6))
+            pygame.draw.circle(s, (*base_color, 255), center, int(size))
+            cycle.append((s, size * 2))
+        return cycle
+
+    def __len__(self): return len(self._cycles)
+
+
+class TrailSprites:
+    """
+    @class TrailSprites
+    @brief Pre-baked fading trails for rhythm notes.
+    @details Rhythm notes fall straight down at a constant step, so a trail of
+             n points is a fixed gradient shape. Each (size, colour, n, step)
+             trail is composed once with the same per-point fade the notes
+             used to draw, and drawn as one blit regardless of its length.
+    """
+    def __init__(self, max_entries: int = 128):
+        self._sprites = SpriteLRU(max_entries)
+
+    def sprite(self, base_size, color, n: int, step: float):
+        """Returns (surface, half_width, height_above_head) for an n-point trail."""
+        size = round(base_size * 2) / 2; step = max(0, int(round(step)))
+        return self._sprites.get((size, color, n, step), lambda: self._build(size, color, n, step))
+
+    def _build(self, base_size, color, n, step):
+        max_t = max(1, int(base_size * ((n - 1) / n) * 0.8)); above = (n - 1) * step + max_t
+        trail = pygame.Surface((max_t * 2, above + max_t), pygame.SRCALPHA)
+        for i in range(n):
+            alpha = int(150 * (i / n)); t_size = max(1, int(base_size * (i / n) * 0.8))
+            dot = pygame.Surface((t_size*2, t_size*2), pygame.SRCALPHA)
+            pygame.draw.circle(dot, (*color, alpha), (t_size, t_size), t_size)
+            trail.blit(dot, (max_t - t_size, above - (n - 1 - i) * step - t_size))
+        return trail, max_t, above
+
+    def __len__(self): return len(self._sprites)
+
+
+class GlowFrames:
+    """
+    @class GlowFrames
+    @brief Shared ring of pulsing glow frames per base-star radius.
+    @details The glow radius follows radius * 2 * (1 + 0.3 * sin(t)), so one
+             period of t is sampled into FRAMES pre-rendered discs that every
+             decorator with the same radius and colour reuses.
+    """
+    FRAMES = 24
+
+    def __init__(self, max_entries: int = 32):
+        self._rings = SpriteLRU(max_entries)
+
+    def ring(self, radius: int, color, alpha: int) -> list:
+        """Returns FRAMES (surface, glow_radius) pairs covering one pulse period."""
+        return self._rings.get((radius, color, alpha), lambda: self._build(radius, color, alpha))
+
+    def frame_index(self, pulse_timer: float) -> int:
+        return int(pulse_timer / (2 * math.pi) * self.FRAMES) % self.FRAMES
+
+    def _build(self, radius, color, alpha):
+        ring = []
+        for i in range(self.FRAMES):
+            glow_radius = max(1, int(radius * 2.0 * (math.sin(2 * math.pi * i / self.FRAMES) * 0.3 + 1.0)))
+            s = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(s, (*color, alpha), (glow_radius, glow_radius), glow_radius)
+            ring.append((s, glow_radius))
+        return ring
+
+    def __len__(self): return len(self._rings)
+
+
+class CloudAtlas(GameEventListener):
+    """
+    @class CloudAtlas
+    @brief Pre-rendered light-theme clouds per (radius bucket, alpha) pair.
+    @details Clouds call prepare() when they read their theme parameters, so
+             the whole atlas is built once when the light theme activates and
+             dropped on the next theme switch. A cloud is then one blit.
+    """
+    PULSE = 3   # clouds pulse by +/- PULSE pixels around their base radius
+
+    def __init__(self):
+        self._sprites: dict = {}
+
+    def on_event(self, event_type: str, data: dict) -> None:
+        if event_type == "theme_switched": self._sprites.clear()
+
+    def prepare(self, radius: float, alpha: int) -> None:
+        """Pre-renders every bucket a cloud of this radius can pulse through."""
+        base = int(round(radius))
+        for bucket in range(base - self.PULSE, base + self.PULSE + 1): self.sprite(bucket, alpha)
+
+    def sprite(self, bucket: int, alpha: int):
+        key = (max(1, bucket), alpha)
+        sprite = self._sprites.get(key)
+        if sprite is None: sprite = self._sprites[key] = self._build(*key)
+        return sprite
+
+    def _build(self, radius, alpha):
+        size = int(radius * 3); center = (size // 2, size // 2)
+        s = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(s, (255, 255, 255, int(alpha * 0.4)), center, int(radius * 1.5))
+        pygame.draw.circle(s, (255, 255, 255, alpha), center, int(radius * 0.7))
+        s.set_alpha(255, pygame.RLEACCEL)   # atlas sprites are read-only; RLE skips the transparent corners
+        return s
+
+    def __len__(self): return len(self._sprites)
+
+
+# =============================================================================
+# 3. OVERLAYS
+# Full-screen dims for transitions, pause, game over and modals.
+# =============================================================================
+class OverlayPool:
+    """
+    @class OverlayPool
+    @brief Shared full-screen overlay service with no per-frame allocation.
+    @details Black dims are a multiply fill straight into the target, which
+             equals blitting a black overlay at the same alpha. Any other
+             colour is drawn from one pre-filled surface per
+             (size, colour, alpha, flags) kept in the pool.
+    """
+    def __init__(self):
+        self._surfaces: dict = {}
+
+    def draw(self, surface, color=BLACK, alpha: int = 255, flags: int = 0) -> None:
+        if alpha <= 0: return
+        if color == BLACK and not flags:
+            surface.fill((255 - alpha, 255 - alpha, 255 - alpha), special_flags=pygame.BLEND_RGB_MULT); return
+        key = (surface.get_size(), color, alpha, flags)
+        overlay = self._surfaces.get(key)
+        if overlay is None:
+            overlay = self._surfaces[key] = pygame.Surface(key[0], flags)
+            if flags & pygame.SRCALPHA: overlay.fill((*color, alpha))
+            else: overlay.fill(color); overlay.set_alpha(alpha)
+        surface.blit(overlay, (0, 0))
+
+    def __len__(self): return len(self._surfaces)
+
+
+# =============================================================================
+# 4. STATIC LAYERS
+# Full-screen layers that only change with the theme (background colour,
+# decorative star field). Built lazily, dropped on "theme_switched".
+# =============================================================================
+class StaticLayers(GameEventListener):
+    """
+    @class StaticLayers
+    @brief Named cache of pre-rendered full-screen layers per theme.
+    @details Owners register a builder(theme) -> Surface under a name; the
+             layer is built on first draw for the current theme and rebuilt
+             lazily after the next theme switch.
+    """
+    def __init__(self):
+        self._builders: dict = {}
+        self._layers: dict = {}
+
+    def register(self, name: str, build) -> None:
+        self._builders[name] = build
+        self._layers = {k: v for k, v in self._layers.items() if k[0] != name}
+
+    def on_event(self, event_type: str, data: dict) -> None:
+        if event_type == "theme_switched": self._layers.clear()
+
+    def get(self, name: str, theme: str):
+        layer = self._layers.get((name, theme))
+        if layer is None: layer = self._layers[(name, theme)] = self._builders[name](theme)
+        return layer
+
+    def draw(self, surface, name: str, theme: str) -> None:
+        surface.blit(self.get(name, theme), (0, 0))
+
+
+# =============================================================================
+# 5. DIRTY RECTANGLES
+# Optional presentation mode: the frame is still composed in full, but only
+# the areas touched this frame or the previous one are pushed to the window.
+# =============================================================================
+def merge_rects(rects, bounds: pygame.Rect) -> list:
+    """Clips rects to bounds (skipping None) and unions every overlapping group into one rect."""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds) if rect else None
+        if not rect: continue
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i)); i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class DirtyRectPresenter:
+    """
+    @class DirtyRectPresenter
+    @brief Presents a frame with display.update(rects) instead of flip().
+    @details A frame is presented in full when forced (theme transitions,
+             state changes), when the drawer could not report its rects, or
+             when the merged dirty area exceeds FULL_FLIP_FRACTION of the
+             screen (e.g. heavy wave animation). Tracks how much of the
+             screen was actually updated.
+             Scenery frames (a theme whose background animates the whole
+             screen, i.e. the light theme's clouds) are always flipped without
+             merging any rects, and are counted apart: they are not part of
+             frames, full_flips or updated_fraction.
+    """
+    FULL_FLIP_FRACTION = 0.6
+
+    def __init__(self, size):
+        self._bounds = pygame.Rect(0, 0, size[0], size[1]); self._screen_area = self._bounds.w * self._bounds.h
+        self._previous: list = [self._bounds]
+        self.frames = 0; self.full_flips = 0; self.scenery_frames = 0; self._updated_area = 0
+
+    def present(self, rects, force_full: bool = False, scenery: bool = False) -> None:
+        if scenery:
+            pygame.display.flip(); self.scenery_frames += 1; self._previous = [self._bounds]; return
+        self.frames += 1
+        if not force_full and rects is not None:
+            merged = merge_rects(rects + self._previous, self._bounds)
+            area = sum(r.w * r.h for r in merged)
+            if area < self.FULL_FLIP_FRACTION * self._screen_area:
+                pygame.display.update(merged); self._updated_area += area; self._previous = rects; return
+        pygame.display.flip(); self.full_flips += 1; self._updated_area += self._screen_area
+        self._previous = rects if rects is not None else [self._bounds]
+
+    def stats(self) -> dict:
+        """Frames presented, full flips, and the mean fraction of the screen updated per frame (scenery frames apart)."""
+        fraction = self._updated_area / (self.frames * self._screen_area) if self.frames else 0.0
+        return {"frames": self.frames, "full_flips": self.full_flips, "updated_fraction": fraction, "scenery_frames": self.scenery_frames}
+
+
+star_sprites = StarSprites()
+event_bus.subscribe(star_sprites)
+trail_sprites = TrailSprites()
+glow_frames = GlowFrames()
+cloud_atlas = CloudAtlas()
+event_bus.subscribe(cloud_atlas)
+overlays = OverlayPool()
+static_layers = StaticLayers()
+event_bus.subscribe(static_layers)
@@ -0,0 +1,247 @@
+"""
+@file replay.py
+@brief Deterministic session recording and playback for the Retinal game.
+@details A session is fully described by its RNG seed, its settings and the
+         held-key mask on every simulation tick. Only mask *changes* are
+         recorded, as SetKeysCommand-style (tick, mask) pairs; playback seeds
+         the RNG, rebuilds the play state and re-simulates tick by tick, so
+         it can fast-forward or seek without drawing the skipped ticks.
+         The simulation state cannot be restored mid-session, so seeking
+         always re-simulates (from tick 0 when going backwards); the periodic
+         checkpoints only record the score, to detect a desync.
+
+File layout (little-endian)
+===========================
+header  : b"RTRP" | u8 version | u16 n | n bytes of JSON (seed, mode, settings...)
+records : varint(tick - previous tick) | u8 mask        (one per mask change)
+checkpts: u32 tick | i32 score                          (every N seconds)
+trailer : u32 checkpoint offset | u32 checkpoint count | u32 final tick | i32 final score | b"RIDX"
+A file without a trailer (the game was killed) is still readable: records
+run to EOF and there are no checkpoints. Version 1 files (whose entries also
+carried an unused record offset and mask) are still read.
+"""
+
+import json
+import logging
+import random
+import struct
+import threading
+from collections import deque
+import pygame
+from config import *
+from engine import KeyMap, theme_mgr
+from events import CommandHistory, SetKeysCommand
+
+# Keys the simulation reads (Basket.update); bit i of a mask = TRACKED_KEYS[i] held
+TRACKED_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_a, pygame.K_d)
+
+MAGIC = b"RTRP"; VERSION = 2; TRAILER_TAG = b"RIDX"
+_HEADER = struct.Struct("<4sBH")
+_CHECKPOINT = {1: struct.Struct("<IIBi"), 2: struct.Struct("<Ii")}   # version -> entry layout; score is always last
+_TRAILER = struct.Struct("<IIIi4s")
+
+
+class ReplayDesync(Exception):
+    """Playback diverged from the recording (checked at every checkpoint)."""
+
+
+def keys_to_mask(keys) -> int:
+    mask = 0
+    for bit, key in enumerate(TRACKED_KEYS):
+        if keys[key]: mask |= 1 << bit
+    return mask
+
+def mask_to_keys(mask: int) -> KeyMap:
+    return KeyMap({key: True for bit, key in enumerate(TRACKED_KEYS) if mask >> bit & 1})
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80: out.append(value & 0x7F | 0x80); value >>= 7
+    out.append(value)
+
+def _read_varint(data, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]; pos += 1; value |= (byte & 0x7F) << shift; shift += 7
+        if byte < 0x80: return value, pos
+
+
+# =============================================================================
+# 1. RECORDING
+# The game thread only appends tuples to a deque (the write queue); encoding,
+# file I/O and the checkpoint table all happen on the writer thread.
+# =============================================================================
+class ReplayWriter:
+    """
+    @class ReplayWriter
+    @brief Background writer that drains the write queue into a replay file.
+    @details Wakes every flush_interval seconds, or early once flush_at items
+             are queued. The queue is unbounded on purpose: dropping a key
+             change would make the replay desync. close() returns at once; the
+             thread writes the checkpoints and the trailer and exits. It is not a
+             daemon, so interpreter exit waits for the file to be complete:
+             whoever owns the recorder must close it, also on errors.
+    """
+    def __init__(self, path: str, header: dict, flush_at: int = 2048, flush_interval: float = 0.5):
+        self._path = path; self._header = header; self._flush_at = flush_at; self._flush_interval = flush_interval
+        self._queue = deque(); self._wake = threading.Event(); self._closing = False; self._final = (0, 0)
+        self._thread = threading.Thread(target=self._run, name="replay-writer"); self._thread.start()
+
+    def push(self, item: tuple) -> None:
+        """Queues (tick, mask) for a key change or (tick, None, score) for a checkpoint. Never blocks."""
+        self._queue.append(item)
+        if len(self._queue) >= self._flush_at: self._wake.set()
+
+    def close(self, final_tick: int, final_score: int) -> None:
+        self._final = (final_tick, final_score); self._closing = True; self._wake.set()
+
+    def wait(self, timeout: float = None) -> None: self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            with open(self._path, "wb") as f:
+                meta = json.dumps(self._header, separators=(",", ":")).encode()
+                f.write(_HEADER.pack(MAGIC, VERSION, len(meta))); f.write(meta)
+                offset = 0; last_tick = 0; checkpoints = bytearray(); entries = 0
+                while True:
+                    closing = self._closing
+                    self._wake.wait(self._flush_interval); self._wake.clear()
+                    out = bytearray()
+                    while self._queue:
+                        item = self._queue.popleft()
+                        if item[1] is None:   # checkpoint: the score playback must match at this tick
+                            checkpoints += _CHECKPOINT[VERSION].pack(item[0], item[2]); entries += 1
+                        else:
+                            _write_varint(out, item[0] - last_tick); out.append(item[1]); last_tick = item[0]
+                    f.write(out); f.flush(); offset += len(out)
+                    if closing: break
+                f.write(checkpoints); f.write(_TRAILER.pack(_HEADER.size + len(meta) + offset, entries, *self._final, TRAILER_TAG))
+        except OSError as e: logging.error(f"Replay writer failed for {self._path}: {e}")
+
+
+class ReplayRecorder:
+    """
+    @class ReplayRecorder
+    @brief Input source wrapper: passes keys through and records mask changes.
+    @details Install with game.set_input(); it is called once per simulation
+             tick. Every checkpoint_seconds it also queues a checkpoint with the
+             current score so playback can check it stays in sync.
+    """
+    def __init__(self, source, writer: ReplayWriter, checkpoint_seconds: float = 10.0, tick_rate: int = TICK_RATE):
+        self._source = source; self._writer = writer; self._checkpoint_every = max(1, int(checkpoint_seconds * tick_rate))
+        self._tick = 0; self._mask = 0; self._state = None
+
+    def __call__(self, state):
+        keys = self._source(state); mask = keys_to_mask(keys); self._state = state
+        if self._tick % self._checkpoint_every == 0: self._writer.push((self._tick, None, state._score))
+        if mask != self._mask: self._writer.push((self._tick, mask)); self._mask = mask
+        self._tick += 1
+        return keys
+
+    def stop(self) -> ReplayWriter:
+        self._writer.close(self._tick, self._state._score if self._state else 0); return self._writer
+
+
+def _keyboard(state): return pygame.key.get_pressed()
+
+def start_recording(game, state, path: str, seed: int = None, source=None, checkpoint_seconds: float = 10.0) -> ReplayRecorder:
+    """
+    @brief Seeds the RNG and starts recording a fresh play state.
+    @details Call before the state's first update; installs the recorder as the game's input.
+    """
+    seed = random.randrange(1 << 32) if seed is None else seed; random.seed(seed)
+    song = getattr(state, "_song_data", None)
+    header = {"seed": seed, "mode": "rhythm" if song else "endless", "song": song, "star_rate": game.get_settings()["star_rate"],
+              "theme": theme_mgr.current_theme, "size": game.get_equipped("size"), "shape": game.get_equipped("shape"),
+              "tick_rate": game.get_tick_rate(), "checkpoint_seconds": checkpoint_seconds}
+    recorder = ReplayRecorder(source or _keyboard, ReplayWriter(path, header), checkpoint_seconds, header["tick_rate"])
+    game.set_input(recorder)
+    return recorder
+
+
+# =============================================================================
+# 2. PLAYBACK
+# =============================================================================
+class Replay:
+    """
+    @class Replay
+    @brief A decoded replay file: header, key changes, (tick, score) checkpoints, final result.
+    """
+    def __init__(self, header: dict, changes: list, checkpoints: list, final_tick: int = None, final_score: int = None):
+        self.header = header; self.changes = changes; self.checkpoints = checkpoints
+        self.final_tick = final_tick if final_tick is not None else (changes[-1][0] + 1 if changes else 0); self.final_score = final_score
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        with open(path, "rb") as f: data = f.read()
+        magic, version, n = _HEADER.unpack_from(data)
+        if magic != MAGIC or version not in _CHECKPOINT: raise ValueError(f"{path}: not a version {VERSION} replay")
+        header = json.loads(data[_HEADER.size:_HEADER.size + n]); start = _HEADER.size + n; end = len(data)
+        checkpoints = []; final_tick = final_score = None; entry = _CHECKPOINT[version]
+        if len(data) - start >= _TRAILER.size and data[-4:] == TRAILER_TAG:
+            table, entries, final_tick, final_score, _ = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+            checkpoints = [(fields[0], fields[-1]) for fields in (entry.unpack_from(data, table + i * entry.size) for i in range(entries))]; end = table
+        changes = []; pos = start; tick = 0
+        while pos < end:
+            delta, pos = _read_varint(data, pos); tick += delta; changes.append((tick, data[pos])); pos += 1
+        return cls(header, changes, checkpoints, final_tick, final_score)
+
+
+class ReplayPlayer:
+    """
+    @class ReplayPlayer
+    @brief Re-simulates a Replay on a Game; acts as the game's input source.
+    @details Key changes are applied through SetKeysCommand on a CommandHistory,
+             so the player's .mask is the held-key state of the current tick.
+             seek() and fast_forward() step the simulation without drawing;
+             seeking backwards restarts from tick 0 (same seed, same result).
+    """
+    def __init__(self, game, replay: Replay):
+        self._game = game; self._replay = replay; self._checks = dict(replay.checkpoints)
+        self.mask = 0; self.state = None; self.tick = 0
+
+    def start(self):
+        """Rebuilds the recorded play state with the recorded seed and settings."""
+        from states import PlayingState, RhythmGameState
+        h = self._replay.header; game = self._game
+        game.get_settings()["star_rate"] = h["star_rate"]; game.equip_item("size", h["size"]); game.equip_item("shape", h["shape"])
+        game.set_theme(h["theme"]); random.seed(h["seed"])
+        self.state = RhythmGameState(game, h["song"]) if h["mode"] == "rhythm" else PlayingState(game)
+        self.mask = 0; self.tick = 0; self._next = 0; self._history = CommandHistory()
+        game.set_input(self); game.change_state(self.state)
+        return self.state
+
+    def __call__(self, state) -> KeyMap:
+        changes = self._replay.changes
+        while self._next < len(changes) and changes[self._next][0] <= self.tick:
+            self._history.push(SetKeysCommand(self, changes[self._next][1])); self._next += 1
+        expected = self._checks.get(self.tick)
+        if expected is not None and state._score != expected: raise ReplayDesync(f"tick {self.tick}: score {state._score}, recorded {expected}")
+        self.tick += 1
+        return mask_to_keys(self.mask)
+
+    def finished(self) -> bool: return self.tick >= self._replay.final_tick or self._game.get_state() is not self.state
+
+    def seek(self, tick: int) -> None:
+        """Moves to the given tick, re-simulating without rendering."""
+        if self.state is None or tick < self.tick: self.start()
+        while self.tick < tick and not self.finished(): self._game.step()
+
+    def fast_forward(self, seconds: float) -> None: self.seek(self.tick + int(seconds * self._replay.header["tick_rate"]))
+
+
+if __name__ == "__main__":
+    # Viewer: python replay.py FILE [--speed=4] [--seek=SECONDS]; RIGHT skips 10 s, 1-4 set the speed
+    import sys
+    from main import Game
+    path = sys.argv[1]; opts = dict(arg[2:].split("=", 1) for arg in sys.argv[2:] if arg.startswith("--") and "=" in arg)
+    replay = Replay.load(path); game = Game(persistent=False, tick_rate=replay.header["tick_rate"]); player = ReplayPlayer(game, replay)
+    player.seek(int(float(opts.get("seek", 0)) * replay.header["tick_rate"])); speed = float(opts.get("speed", 1)); clock = pygame.time.Clock()
+    while not player.finished():
+        dt = min(clock.tick(FPS) / 1000.0, MAX_FRAME_TIME)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: player.seek(replay.final_tick)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT: player.fast_forward(10)
+            elif event.type == pygame.KEYDOWN and pygame.K_1 <= event.key <= pygame.K_4: speed = 2 ** (event.key - pygame.K_1)
+        game.advance(dt * speed); game.render_frame()
+    print(f"Replay finished at tick {player.tick}: score {player.state._score} (recorded {replay.final_score})")
+    pygame.quit()
@@ -0,0 +1,200 @@
+"""
+@file scenarios.py
+@brief End-to-end scenario benchmarks for the Retinal game.
+@details Drives the real main loop (Game.run_frame: events, theme, waves,
+         fixed-step simulation, draw, present) under the SDL dummy drivers
+         through scripted scenes and reports frame-time percentiles, the
+         worst frame and the per-frame peak growth of Python heap memory
+         (tracemalloc; SDL surface pixels are not traced). Results can be stored
+         as a baseline and later runs compared against it; regressions are
+         flagged and make the process exit with status 1.
+         Usage: python scenarios.py [--only menu_idle,shop] [--repeat N] [--json FILE]
+                [--baseline FILE] [--save-baseline FILE] [--no-memory]
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import pygame
+from config import *
+from engine import theme_mgr
+from events import event_bus
+
+
+# =============================================================================
+# 1. SCENES
+# setup(game) puts the game in the scene and returns (frames, script); the
+# script runs before every frame with the frame number and may return None.
+# =============================================================================
+SCENARIOS = {}
+
+def scenario(name: str):
+    def register(setup): SCENARIOS[name] = setup; return setup
+    return register
+
+
+def _bot_session(game, state, seed: int):
+    from simulate import BotInput
+    game.set_input(BotInput(seed)); game.change_state(state)
+
+
+@scenario("menu_idle")
+def _menu_idle(game):
+    from states import MenuState
+    game.change_state(MenuState(game))
+    return 600, None
+
+@scenario("endless_ramp")
+def _endless_ramp(game):
+    # Speed is forced from 1.0 to 5.0 over 80% of the run; misses are forgiven so the session never ends
+    from states import PlayingState
+    random.seed(1); state = PlayingState(game); _bot_session(game, state, 1); frames = 1800
+    def script(frame):
+        state._speed_multiplier = 1.0 + 4.0 * min(1.0, frame / (frames * 0.8)); state._missed_stars = 0
+    return frames, script
+
+@scenario("rhythm_song")
+def _rhythm_song(game):
+    from states import RhythmGameState
+    song = SONG_LIST[0]; notes = len(game.notes_data.get(song["note_id"], [])) or 32
+    random.seed(2); state = RhythmGameState(game, song); _bot_session(game, state, 2)
+    def script(frame): state._missed_notes = 0
+    return int((notes * 2 * 60.0 / song["bpm"] + 3) * FPS), script
+
+@scenario("theme_transition")
+def _theme_transition(game):
+    from states import PlayingState
+    random.seed(3); state = PlayingState(game); _bot_session(game, state, 3)
+    def script(frame):
+        state._missed_stars = 0
+        if frame == 120: theme_mgr.start_transition()
+    return 600, script
+
+@scenario("shop")
+def _shop(game):
+    # Clicks through the three tabs, rebuilding the item buttons each time
+    from states import ShopState
+    state = ShopState(game); game.change_state(state)
+    def script(frame):
+        if frame % 45 == 0:
+            tab = state._tabs[frame // 45 % len(state._tabs)]
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=tab._rect.center))
+    return 600, script
+
+
+# =============================================================================
+# 2. MEASUREMENT
+# =============================================================================
+def _percentile(ordered, q: float) -> float: return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _reset(game):
+    theme_mgr.current_theme = theme_mgr.target_theme = "dark"; theme_mgr.is_transitioning = False; theme_mgr.transition_alpha = 0
+    event_bus.notify("theme_switched", {"theme": "dark"}); game.set_input(None); pygame.event.clear()
+
+def _play(game, name: str, frame_hook):
+    _reset(game); frames, script = SCENARIOS[name](game); dt = 1.0 / FPS
+    for frame in range(frames):
+        if script: script(frame)
+        frame_hook(frame, lambda: game.run_frame(dt))
+    return frames
+
+
+def _timed_pass(game, name: str) -> dict:
+    times = []
+    def timed(frame, run):
+        start = time.perf_counter(); run(); times.append((time.perf_counter() - start) * 1000)
+    gc0 = gc.get_stats()[0]["collections"]
+    frames = _play(game, name, timed)
+    gc0 = gc.get_stats()[0]["collections"] - gc0
+    ordered = sorted(times)
+    return {"frames": frames, "mean_ms": sum(times) / frames, "p50_ms": _percentile(ordered, 0.50), "p95_ms": _percentile(ordered, 0.95),
+            "p99_ms": _percentile(ordered, 0.99), "worst_ms": ordered[-1], "worst_frame": times.index(ordered[-1]),
+            "gc0_per_1k_frames": gc0 * 1000 / frames}
+
+
+def run_scenario(game, name: str, repeat: int = 3, memory: bool = True, traced_frames: int = 300) -> dict:
+    """
+    @brief Plays one scene repeat times timed (GC on, as in the game), then once under tracemalloc for memory.
+    @details Every timing metric is the median over the repeats, which keeps a
+             single noisy run from reading as a regression. The traced pass is
+             capped at traced_frames; tracemalloc slows every allocation, so its
+             timings are discarded. peak_kb is how far traced memory rose above
+             the frame's starting point at its highest: memory allocated and
+             freed repeatedly within a frame counts once, so it is not an
+             allocation count.
+    """
+    runs = [_timed_pass(game, name) for _ in range(repeat)]
+    result = {metric: sorted(run[metric] for run in runs)[len(runs) // 2] for metric in runs[0]}
+    result["frames"] = runs[0]["frames"]; result["repeat"] = repeat
+    if memory:
+        peaks = []
+        def traced(frame, run):
+            if frame >= traced_frames: return
+            tracemalloc.reset_peak(); before = tracemalloc.get_traced_memory()[0]; run()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        tracemalloc.start()
+        try: _play(game, name, traced)
+        finally: tracemalloc.stop()
+        result.update(peak_kb=sum(peaks) / len(peaks) / 1024, peak_kb_max=max(peaks) / 1024)
+    return result
+
+
+# =============================================================================
+# 3. BASELINE COMPARISON
+# A metric regresses when it exceeds the baseline by more than its relative
+# tolerance AND by more than the absolute noise floor.
+# =============================================================================
+TOLERANCE = {"p50_ms": 0.15, "p95_ms": 0.25, "p99_ms": 0.40, "worst_ms": 1.00, "peak_kb": 0.25}
+NOISE_FLOOR = {"p50_ms": 0.3, "p95_ms": 0.5, "p99_ms": 2.0, "worst_ms": 5.0, "peak_kb": 1.0}
+
+def compare(results: dict, baseline: dict) -> list:
+    """Returns [(scenario, metric, baseline, current)] for every regressed metric."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base: continue
+        for metric, tolerance in TOLERANCE.items():
+            if metric in metrics and metric in base:
+                old, new = base[metric], metrics[metric]
+                if new > old * (1 + tolerance) and new - old > NOISE_FLOOR[metric]: regressions.append((name, metric, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retinal scenario benchmarks")
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="write the results as the new baseline")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario (metrics are medians)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    from main import Game
+    game = Game(persistent=False)
+    names = [n for n in args.only.split(",") if n] or list(SCENARIOS)
+    results = {}
+    print(f"{'scenario':<18} {'frames':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'worst':>7} {'peak KB':>9} {'gc0/1k':>7}")
+    for name in names:
+        r = results[name] = run_scenario(game, name, args.repeat, memory=not args.no_memory)
+        print(f"{name:<18} {r['frames']:>6} {r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['worst_ms']:>7.2f} "
+              f"{r.get('peak_kb', float('nan')):>9.1f} {r['gc0_per_1k_frames']:>7.1f}")
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f: json.dump(results, f, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f: regressions = compare(results, json.load(f))
+        for name, metric, old, new in regressions: print(f"REGRESSION {name}.{metric}: {old:.2f} -> {new:.2f}")
+        if not regressions: print(f"No regressions against {args.baseline}")
+    pygame.quit()
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,183 @@
+"""
+@file simulate.py
+@brief Headless simulation runner and difficulty sweeps for the Retinal game.
+@details Steps PlayingState / RhythmGameState one fixed tick at a time, as
+         fast as the CPU allows: nothing is drawn, no audio plays and no
+         save file is touched. A bot (or a key script) stands in for the
+         keyboard. sweep() fans seeded sessions out over a process pool and
+         aggregates them per (star_rate, speed_step) cell.
+         Usage: python simulate.py [--mode endless|rhythm] [--rates 80,100,130]
+                [--steps 0.02,0.03,0.05] [--seeds 16] [--minutes 5] [--workers N] [--json FILE]
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
+
+import argparse
+import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+import pygame
+from config import *
+from engine import KeyMap
+from events import GameEventListener, event_bus
+
+
+# =============================================================================
+# 1. INPUT SOURCES
+# Called by Game.get_keys() with the current state once per tick; return a
+# pressed-key map indexed like pygame.key.get_pressed().
+# =============================================================================
+class ScriptedInput:
+    """
+    @class ScriptedInput
+    @brief Replays a key script: [(tick, [keys held from that tick on]), ...].
+    """
+    def __init__(self, script):
+        self._script = sorted(script, key=lambda entry: entry[0])
+        self._next = 0; self._tick = 0; self._keys = KeyMap()
+
+    def __call__(self, state) -> KeyMap:
+        while self._next < len(self._script) and self._script[self._next][0] <= self._tick:
+            self._keys = KeyMap.fromkeys(self._script[self._next][1], True); self._next += 1
+        self._tick += 1
+        return self._keys
+
+
+class BotInput:
+    """
+    @class BotInput
+    @brief Steers the basket under the lowest object that can still be caught.
+    @details reaction is the chance per tick that the bot re-reads the field
+             (lower = slower player); between reads it keeps holding the same
+             keys. jitter is the aim error in pixels, drawn once per target.
+             The bot has its own RNG, so it never shifts the game's spawns.
+    """
+    DEADZONE = 6
+
+    def __init__(self, seed: int = 0, reaction: float = 0.6, jitter: float = 25.0):
+        self._rng = random.Random(seed); self._reaction = reaction; self._jitter = jitter
+        self._keys = KeyMap(); self._target = None; self._aim = 0.0
+
+    def __call__(self, state) -> KeyMap:
+        if self._rng.random() >= self._reaction: return self._keys
+        basket = state._basket.get_rect(); target = None
+        for obj in state._star_manager:
+            if obj.get_y() < basket.bottom and (target is None or obj.get_y() > target.get_y()): target = obj
+        if target is None: self._keys = KeyMap(); return self._keys
+        if target is not self._target: self._target = target; self._aim = self._rng.uniform(-self._jitter, self._jitter)
+        error = target.get_rect().centerx + self._aim - basket.centerx
+        if error > self.DEADZONE: self._keys = KeyMap({pygame.K_RIGHT: True})
+        elif error < -self.DEADZONE: self._keys = KeyMap({pygame.K_LEFT: True})
+        else: self._keys = KeyMap()
+        return self._keys
+
+
+# =============================================================================
+# 2. SESSION RUNNER
+# One sandboxed Game per process (persistent=False: no save file, no session
+# snapshot, no music); every session gets a fresh play state on top of it.
+# =============================================================================
+_game = None
+
+def _session_game():
+    global _game
+    if _game is None:
+        from main import Game
+        _game = Game(headless=True, persistent=False)
+    return _game
+
+
+class _SessionCounter(GameEventListener):
+    """Counts catches and misses reported through event_bus during one session."""
+    def __init__(self): self.caught = 0; self.missed = 0
+    def on_event(self, event_type: str, data: dict) -> None:
+        if event_type == "score": self.caught += 1
+        elif event_type == "miss": self.missed += 1
+
+
+def run_session(mode: str = "endless", star_rate: int = 100, speed_step: float = None, max_speed: float = None,
+                seed: int = 0, max_seconds: float = 300.0, song: int = 0, input_source=None) -> dict:
+    """
+    @brief Plays one seeded session to game over or max_seconds of game time.
+    @param mode        "endless" (PlayingState) or "rhythm" (RhythmGameState, SONG_LIST[song]).
+    @param star_rate   Endless spawn interval in reference frames (the difficulty setting).
+    @param speed_step  Speed multiplier gained per caught star; None keeps the game default.
+    @param max_speed   Speed multiplier ceiling; None keeps the game default.
+    @param input_source Key source for Game.set_input(); defaults to BotInput(seed).
+    @return Per-session stats: survival seconds, score, caught, missed, miss_rate, ...
+    """
+    from states import PlayingState, RhythmGameState
+    game = _session_game(); random.seed(seed)
+    game.get_settings()["star_rate"] = star_rate
+    state = RhythmGameState(game, SONG_LIST[song]) if mode == "rhythm" else PlayingState(game)
+    if speed_step is not None: state.SPEED_STEP = speed_step
+    if max_speed is not None: state.MAX_SPEED_MULTIPLIER = max_speed
+    game.set_input(input_source or BotInput(seed)); game.change_state(state)
+
+    counter = _SessionCounter(); event_bus.subscribe(counter)
+    ticks = 0; limit = int(max_seconds * TICK_RATE)
+    try:
+        while game.get_state() is state and ticks < limit: game.step(); ticks += 1
+    finally:
+        event_bus.unsubscribe(counter); game.set_input(None)
+    attempts = counter.caught + counter.missed
+    return {"mode": mode, "star_rate": star_rate, "speed_step": state.SPEED_STEP if mode == "endless" else None, "seed": seed,
+            "survival": ticks / TICK_RATE, "game_over": game.get_state() is not state, "score": state._score,
+            "caught": counter.caught, "missed": counter.missed, "miss_rate": counter.missed / attempts if attempts else 0.0,
+            "final_speed": getattr(state, "_speed_multiplier", 1.0)}
+
+
+# =============================================================================
+# 3. BATCH SWEEPS
+# =============================================================================
+def _run_task(kwargs: dict) -> dict: return run_session(**kwargs)
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values); return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def aggregate(results: list) -> dict:
+    """Summary of a group of sessions: survival, score distribution and miss rate."""
+    survival = [r["survival"] for r in results]; scores = [r["score"] for r in results]; n = len(results)
+    return {"sessions": n, "game_over_rate": sum(r["game_over"] for r in results) / n,
+            "survival_mean": sum(survival) / n, "survival_p50": _percentile(survival, 0.5), "survival_p10": _percentile(survival, 0.1),
+            "score_mean": sum(scores) / n, "score_p10": _percentile(scores, 0.1), "score_p50": _percentile(scores, 0.5),
+            "score_p90": _percentile(scores, 0.9), "score_max": max(scores),
+            "miss_rate": sum(r["miss_rate"] for r in results) / n}
+
+
+def sweep(star_rates, speed_steps, seeds: int = 16, mode: str = "endless", max_seconds: float = 300.0, workers: int = None) -> list:
+    """
+    @brief Runs every (star_rate, speed_step, seed) session across a process pool.
+    @return One row per (star_rate, speed_step): the cell's parameters merged with aggregate().
+    """
+    cells = [(rate, step) for rate in star_rates for step in speed_steps]
+    tasks = [{"mode": mode, "star_rate": rate, "speed_step": step, "seed": seed, "max_seconds": max_seconds}
+             for rate, step in cells for seed in range(seeds)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))))
+    return [{"star_rate": rate, "speed_step": step, **aggregate(results[i * seeds:(i + 1) * seeds])} for i, (rate, step) in enumerate(cells)]
+
+
+def _floats(text: str) -> list: return [float(v) for v in text.split(",") if v]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Retinal difficulty sweep")
+    parser.add_argument("--mode", choices=("endless", "rhythm"), default="endless")
+    parser.add_argument("--rates", type=_floats, default=[130, 100, 80], help="star_rate values (Easy/Normal/Hard = 130/100/80)")
+    parser.add_argument("--steps", type=_floats, default=[0.03], help="speed multiplier gain per caught star")
+    parser.add_argument("--seeds", type=int, default=16, help="sessions per cell")
+    parser.add_argument("--minutes", type=float, default=5.0, help="game-time cap per session")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", help="also write the rows to this file")
+    args = parser.parse_args()
+
+    rows = sweep(args.rates, args.steps, args.seeds, args.mode, args.minutes * 60, args.workers)
+    print(f"{'rate':>6} {'step':>6} {'over%':>6} {'surv p50':>9} {'score p10':>9} {'p50':>7} {'p90':>7} {'miss%':>6}")
+    for row in rows:
+        print(f"{row['star_rate']:>6g} {row['speed_step']:>6g} {row['game_over_rate'] * 100:>5.0f}% {row['survival_p50']:>8.1f}s "
+              f"{row['score_p10']:>9} {row['score_p50']:>7} {row['score_p90']:>7} {row['miss_rate'] * 100:>5.1f}%")
+    if args.json:
+        with open(args.json, "w") as f: json.dump(rows, f, indent=2)
@@ -0,0 +1,99 @@
+"""
+@file soundbank.py
+@brief Lazily loaded, memory-bounded note sound bank for the Retinal game.
+@details Startup only indexes the note files (one directory listing); no note
+         is decoded. Selecting a song decodes that song's note set on a small
+         thread pool (pygame decodes with the GIL released) while the first
+         notes are still falling. Decoded sounds live in an LRU bounded by a
+         byte budget, so switching songs evicts the notes that are no longer
+         played instead of growing the bank to every file on disk.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import pygame
+from config import *
+
+
+class NoteBank:
+    """
+    @class NoteBank
+    @brief Note name -> pygame Sound, loaded on demand, LRU-evicted past budget_bytes.
+    @details Files are named like "a-3.ogg"; notes.json writes sharps as "a#3",
+             so both spellings resolve to the same file and the same Sound.
+             get() never decodes on the caller's thread: a note that is not
+             loaded yet is queued and the call returns None (that note is
+             silent once). Until scan() has run the bank is empty and inert,
+             which is what headless games rely on. With an AssetPack, notes
+             it holds are built from the mapped PCM instead of being decoded.
+    """
+    def __init__(self, budget_bytes: int = NOTE_BANK_BUDGET_MB * 2**20, workers: int = 4, loader=None):
+        self._budget = budget_bytes; self._workers = workers; self._loader = loader or pygame.mixer.Sound
+        self._paths = {}; self._sounds: OrderedDict = OrderedDict(); self._sizes = {}; self._bytes = 0
+        self._loading = {}; self._lock = threading.Lock(); self._pool = None; self._pack = None
+
+    def scan(self, folder: str = SOUND_FOLDER, pack=None) -> int:
+        """Indexes the .ogg files in folder (and the pack to load them from); returns the number of notes found."""
+        self._pack = pack
+        if not os.path.exists(folder): return 0
+        for filename in os.listdir(folder):
+            if filename.endswith(".ogg"): self._paths[os.path.splitext(filename)[0]] = os.path.join(folder, filename)
+        return len(self._paths)
+
+    def __len__(self): return len(self._sounds)
+    def __contains__(self, name): return self._key(name) in self._sounds
+    def memory_bytes(self) -> int: return self._bytes
+
+    def get(self, name: str):
+        """The decoded Sound, or None (queueing the load) if it is not in memory yet."""
+        key = self._key(name)
+        with self._lock:
+            sound = self._sounds.get(key)
+            if sound is not None: self._sounds.move_to_end(key); return sound
+        if key in self._paths: self._submit(key)
+        return None
+
+    def preload(self, names) -> Future:
+        """Queues every note in names; the returned future completes when all of them are loaded."""
+        futures = [self._submit(key) for key in {self._key(name) for name in names} if key in self._paths]
+        done = Future(); pending = [len(futures)]
+        if not futures: done.set_result(0); return done
+        def finished(_):
+            with self._lock:
+                pending[0] -= 1; last = pending[0] == 0
+            if last: done.set_result(len(futures))
+        for future in futures: future.add_done_callback(finished)
+        return done
+
+    def _key(self, name: str) -> str: return name.replace("#", "-")
+
+    def _submit(self, key: str) -> Future:
+        with self._lock:
+            future = self._loading.get(key)
+            if future is not None: return future
+            if key in self._sounds: future = Future(); future.set_result(self._sounds[key]); return future
+            if self._pool is None: self._pool = ThreadPoolExecutor(self._workers, thread_name_prefix="note-loader")
+            future = self._loading[key] = self._pool.submit(self._load, key)
+            return future
+
+    def _load(self, key: str):
+        try: sound = self._pack.sound(key) if self._pack is not None and key in self._pack else self._loader(self._paths[key])
+        except Exception as e: logging.debug(f"Note sound not loaded: {key} ({e})"); sound = None
+        with self._lock:
+            self._loading.pop(key, None)
+            if sound is None: return None
+            self._sounds[key] = sound; self._sizes[key] = self._sound_bytes(sound); self._bytes += self._sizes[key]
+            while self._bytes > self._budget and len(self._sounds) > 1:
+                evicted, _ = self._sounds.popitem(last=False); self._bytes -= self._sizes.pop(evicted)
+        return sound
+
+    @staticmethod
+    def _sound_bytes(sound) -> int:
+        # Decoded PCM size: seconds * rate * channels * bytes per sample of the mixer format
+        init = pygame.mixer.get_init()
+        if not init: return 0
+        frequency, size, channels = init
+        return int(sound.get_length() * frequency * channels * (abs(size) // 8))
@@ -1,9 +1,11 @@
 import pygame
 import random
 from config import *
-from engine import GameState, Button, Slider, ConfirmationModal, ShopItemButton, loc, theme_mgr, draw_text, ObjectManager, GameObject
-from entities import Basket, Currency, Star, Particle
-from events import session_caretaker, GameMemento, event_bus, audio
+from engine import GameState, Button, Slider, ConfirmationModal, ShopItemButton, Label, loc, theme_mgr, draw_text, ObjectManager, GameObject, measure_time
+from entities import Basket, Currency, Star, ParticleSystem
+from events import GameMemento, event_bus, audio
+from render import overlays
+from collisions import CollisionSweep, YColumn
 
 class MenuState(GameState):
     def __init__(self, game):
@@ -15,7 +17,7 @@ class MenuState(GameState):
         self._btn_settings = Button(270, 420, 200, 60, "SETTINGS", "normal", game.FONT_MEDIUM)
         self._btn_quit = Button(WIDTH//2 - 100, 520, 200, 60, "QUIT", "normal", game.FONT_MEDIUM)
         self._buttons = [self._btn_start, self._btn_rhythm, self._btn_shop, self._btn_settings, self._btn_theme, self._btn_quit]
-        self._confirm_modal = None; self._update_theme_btn()
+        self._lbl_title = Label(WIDTH // 2, 150); self._confirm_modal = None; self._update_theme_btn()
 
     def _update_theme_btn(self): self._btn_theme.set_text_key("LIGHT" if theme_mgr.current_theme == "dark" else "DARK")
     def handle_event(self, event):
@@ -38,9 +40,10 @@ class MenuState(GameState):
         for btn in self._buttons: btn.update(dt, mouse_pos=mouse_pos)
 
     def draw(self, surface):
-        draw_text(surface, "Retinal", self._game.FONT_BIG, WIDTH // 2, 150, color=theme_mgr.get("text_color"))
-        for btn in self._buttons: btn.draw(surface)
-        if self._confirm_modal: self._confirm_modal.draw(surface)
+        rects = [self._lbl_title.draw(surface, "Retinal", self._game.FONT_BIG, theme_mgr.get("text_color"))]
+        rects.extend(btn.draw(surface) for btn in self._buttons)
+        if self._confirm_modal: rects.append(self._confirm_modal.draw(surface))
+        return rects
 
 class ShopState(GameState):
     def __init__(self, game):
@@ -51,6 +54,7 @@ class ShopState(GameState):
         self._btn_tab_shapes = Button(340, 100, 140, 40, "TAB_SHAPES", "normal", game.FONT_SMALL)
         self._btn_reset = Button(WIDTH//2 - 100, 650, 200, 40, "RESET", "normal", game.FONT_SMALL)
         self._tabs = [self._btn_tab_colors, self._btn_tab_sizes, self._btn_tab_shapes]
+        self._lbl_title = Label(WIDTH // 2, 30); self._lbl_currency = Label(WIDTH - 100, 30)
         self._create_item_buttons()
         
     def _create_item_buttons(self):
@@ -80,30 +84,33 @@ class ShopState(GameState):
 
     def draw(self, surface):
         txt_col = theme_mgr.get("text_color")
-        draw_text(surface, f"{loc.get('SHOP')} - {loc.get(f'TAB_{self._current_tab.upper()}')}", self._game.FONT_MEDIUM, WIDTH // 2, 30, color=txt_col)
-        draw_text(surface, f"{loc.get('CURRENCY')} {self._game.get_currency()}", self._game.FONT_SMALL, WIDTH - 100, 30, GOLD)
-        self._btn_back.draw(surface); self._btn_reset.draw(surface)
-        for tab in self._tabs: tab.draw(surface)
-        for item in self._items: item.draw(surface)
+        rects = [self._lbl_title.draw(surface, f"{loc.get('SHOP')} - {loc.get(f'TAB_{self._current_tab.upper()}')}", self._game.FONT_MEDIUM, txt_col)]
+        rects.append(self._lbl_currency.draw(surface, f"{loc.get('CURRENCY')} {self._game.get_currency()}", self._game.FONT_SMALL, GOLD))
+        rects.append(self._btn_back.draw(surface)); rects.append(self._btn_reset.draw(surface))
+        rects.extend(tab.draw(surface) for tab in self._tabs)
+        rects.extend(item.draw(surface) for item in self._items)
+        return rects
 
 class RhythmSelectionState(GameState):
     def __init__(self, game):
         super().__init__(game); self._buttons = []
         for i, song in enumerate(SONG_LIST): self._buttons.append(Button(WIDTH//2 - 150, 250 + i * 80, 300, 60, song["name"], "normal", game.FONT_SMALL))
         self._btn_back = Button(WIDTH//2 - 100, 650, 200, 50, "BACK", "normal", game.FONT_MEDIUM); self._buttons.append(self._btn_back)
+        self._lbl_title = Label(WIDTH // 2, 150)
 
     def handle_event(self, event):
         if self._btn_back.check_click(event): self._game.change_state(MenuState(self._game))
         for i, btn in enumerate(self._buttons[:-1]):
-            if btn.check_click(event): self._game.change_state(RhythmGameState(self._game, SONG_LIST[i]))
+            if btn.check_click(event): self._game.load_song_notes(SONG_LIST[i]); self._game.change_state(RhythmGameState(self._game, SONG_LIST[i]))
 
     def update(self, dt):
         mouse_pos = pygame.mouse.get_pos()
         for btn in self._buttons: btn.update(dt, mouse_pos=mouse_pos)
 
     def draw(self, surface):
-        draw_text(surface, loc.get("SELECT_SONG"), self._game.FONT_MEDIUM, WIDTH // 2, 150, color=theme_mgr.get("text_color"))
-        for btn in self._buttons: btn.draw(surface)
+        rects = [self._lbl_title.draw(surface, loc.get("SELECT_SONG"), self._game.FONT_MEDIUM, theme_mgr.get("text_color"))]
+        rects.extend(btn.draw(surface) for btn in self._buttons)
+        return rects
 
 class SettingsState(GameState):
     def __init__(self, game):
@@ -118,6 +125,7 @@ class SettingsState(GameState):
         self._btn_easy = Button(WIDTH//2 - 100, 300, 200, 50, "EASY", "normal", game.FONT_SMALL)
         self._btn_medium = Button(WIDTH//2 - 100, 370, 200, 50, "NORMAL", "normal", game.FONT_SMALL)
         self._btn_hard = Button(WIDTH//2 - 100, 440, 200, 50, "HARD", "normal", game.FONT_SMALL)
+        self._lbl_title = Label(WIDTH // 2, 150); self._lbl_music = Label(WIDTH // 2, 270); self._lbl_sfx = Label(WIDTH // 2, 370)
 
     def _update_button_states(self):
         settings = self._game.get_settings()
@@ -156,15 +164,16 @@ class SettingsState(GameState):
     def draw(self, surface):
         txt_col = theme_mgr.get("text_color")
         if self._current_view == "main":
-            draw_text(surface, loc.get("SETTINGS"), self._game.FONT_BIG, WIDTH // 2, 150, color=txt_col)
-            self._btn_to_audio.draw(surface); self._btn_to_diff.draw(surface); self._btn_lang.draw(surface); self._btn_back_main.draw(surface)
+            rects = [self._lbl_title.draw(surface, loc.get("SETTINGS"), self._game.FONT_BIG, txt_col)]
+            rects.extend(btn.draw(surface) for btn in [self._btn_to_audio, self._btn_to_diff, self._btn_lang, self._btn_back_main])
         elif self._current_view == "audio":
-            draw_text(surface, loc.get("AUDIO"), self._game.FONT_MEDIUM, WIDTH // 2, 150, color=txt_col); draw_text(surface, loc.get("MUSIC_VOL"), self._game.FONT_SMALL, WIDTH // 2, 270, color=txt_col)
-            self._slider_music.draw(surface); draw_text(surface, loc.get("SFX_VOL"), self._game.FONT_SMALL, WIDTH // 2, 370, color=txt_col); self._slider_sfx.draw(surface)
-            self._btn_back_sub.draw(surface)
+            rects = [self._lbl_title.draw(surface, loc.get("AUDIO"), self._game.FONT_MEDIUM, txt_col), self._lbl_music.draw(surface, loc.get("MUSIC_VOL"), self._game.FONT_SMALL, txt_col)]
+            rects.append(self._slider_music.draw(surface)); rects.append(self._lbl_sfx.draw(surface, loc.get("SFX_VOL"), self._game.FONT_SMALL, txt_col)); rects.append(self._slider_sfx.draw(surface))
+            rects.append(self._btn_back_sub.draw(surface))
         elif self._current_view == "difficulty":
-            draw_text(surface, loc.get("DIFFICULTY"), self._game.FONT_MEDIUM, WIDTH // 2, 150, color=txt_col)
-            self._btn_easy.draw(surface); self._btn_medium.draw(surface); self._btn_hard.draw(surface); self._btn_back_sub.draw(surface)
+            rects = [self._lbl_title.draw(surface, loc.get("DIFFICULTY"), self._game.FONT_MEDIUM, txt_col)]
+            rects.extend(btn.draw(surface) for btn in [self._btn_easy, self._btn_medium, self._btn_hard, self._btn_back_sub])
+        return rects
 
 class GameOverState(GameState):
     def __init__(self, game, score, song_data=None):
@@ -177,13 +186,15 @@ class GameOverState(GameState):
     def update(self, dt):
         mouse_pos = pygame.mouse.get_pos(); self._btn_retry.update(dt, mouse_pos=mouse_pos); self._btn_menu.update(dt, mouse_pos=mouse_pos)
     def draw(self, surface):
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); overlay.fill((0, 0, 0, 200)); surface.blit(overlay, (0, 0))
+        overlays.draw(surface, BLACK, 200)
         draw_text(surface, loc.get("GAME_OVER"), self._game.FONT_BIG, WIDTH // 2, 150, RED_ERROR)
         draw_text(surface, f"{loc.get('SCORE')} {self._score}", self._game.FONT_MEDIUM, WIDTH // 2, 250, WHITE)
         draw_text(surface, f"{loc.get('HIGH_SCORE')} {self._high_score}", self._game.FONT_SMALL, WIDTH // 2, 300, (255, 215, 0))
         self._btn_retry.draw(surface); self._btn_menu.draw(surface)
+        return [surface.get_rect()]
 
 class PausedState(GameState):
+    interpolated = False
     def __init__(self, game, previous_state):
         super().__init__(game); self._previous_state = previous_state; self._font = game.FONT_BIG
         self._btn_resume = Button(WIDTH//2 - 100, HEIGHT//2 - 30, 200, 60, "RESUME", "normal", game.FONT_MEDIUM)
@@ -194,19 +205,7 @@ class PausedState(GameState):
     def _save_memento(self, state):
         """Creates and persists a GameMemento from the active game state."""
         try:
-            if isinstance(state, PlayingState):
-                memento = GameMemento(
-                    score=state._score, combo=state._combo,
-                    missed=state._missed_stars, elapsed=0.0, mode="endless"
-                )
-                session_caretaker.save(memento)
-            elif isinstance(state, RhythmGameState):
-                memento = GameMemento(
-                    score=state._score, combo=0,
-                    missed=state._missed_notes, elapsed=state._timer,
-                    mode="rhythm", song_data=state._song_data
-                )
-                session_caretaker.save(memento)
+            if isinstance(state, (PlayingState, RhythmGameState)): self._game.save_session(state.create_memento())
         except Exception:
             pass  # saving is best-effort; never crash the game
     def handle_event(self, event):
@@ -215,62 +214,81 @@ class PausedState(GameState):
     def update(self, dt):
         mouse_pos = pygame.mouse.get_pos(); self._btn_resume.update(dt, mouse_pos=mouse_pos); self._btn_menu.update(dt, mouse_pos=mouse_pos)
     def draw(self, surface):
-        self._previous_state.draw(surface); overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); overlay.fill((0, 0, 0, 180)); surface.blit(overlay, (0, 0))
+        self._previous_state.draw(surface); overlays.draw(surface, BLACK, 180)
         draw_text(surface, loc.get("PAUSED"), self._font, WIDTH // 2, HEIGHT // 3, WHITE); self._btn_resume.draw(surface); self._btn_menu.draw(surface)
+        return [surface.get_rect()]
+
+# MEMENTO — live falling objects as (kind, x, y, note) tuples; kinds: s = star, c = coin
+_MEMENTO_KINDS = {Star: "s", Currency: "c"}
+
+def _memento_entities(manager) -> tuple:
+    return tuple((_MEMENTO_KINDS.get(obj.__class__, "o"), *obj.get_pos(), obj.get_note_name() if isinstance(obj, Star) else None) for obj in manager)
 
 class PlayingState(GameState):
+    SPEED_STEP = 0.03; MAX_SPEED_MULTIPLIER = 5.0   # speed-up per caught star, and its ceiling
     def __init__(self, game):
-        super().__init__(game); self._basket = Basket(game); self._star_manager = ObjectManager[GameObject](); self._particle_manager = ObjectManager[Particle](); self.reset_game()
+        super().__init__(game); self._basket = Basket(game); self._star_manager = ObjectManager[GameObject](); self._particles = ParticleSystem(); self._collisions = CollisionSweep()
+        # y columns the collision sweep reads, kept in step with the manager
+        self._star_ys = self._star_manager.attach_index(Star, YColumn()); self._coin_ys = self._star_manager.attach_index(Currency, YColumn()); self.reset_game()
     def reset_game(self):
-        self._score = 0; self._combo = 0; self._missed_stars = 0; self._speed_multiplier = 1.0; self._star_add_counter = 0; self._current_add_rate = self._game.get_settings()["star_rate"]; self._star_manager.clear(); self._particle_manager.clear()
+        self._score = 0; self._combo = 0; self._missed_stars = 0; self._speed_multiplier = 1.0; self._star_add_counter = 0; self._current_add_rate = self._game.get_settings()["star_rate"]; self._star_manager.clear(); self._particles.clear()
+        self._elapsed = 0.0; self._autosave_timer = 0.0
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE: self._game.change_state(PausedState(self._game, self))
-    def _spawn_stars(self):
-        self._star_add_counter += 1
+    def _spawn_stars(self, dt):
+        # star_rate is the spawn interval in reference frames (1 / FPS s)
+        self._star_add_counter += FPS * dt
         if self._star_add_counter >= self._current_add_rate:
             self._star_add_counter = 0
             if random.random() < 0.05: self._star_manager.add(Currency(self._speed_multiplier))
             else:
                 for _ in range(3 if self._speed_multiplier > 3.5 else (2 if self._speed_multiplier > 2.0 else 1)): self._star_manager.add(Star(self._speed_multiplier, self._game))
+    @measure_time
     def _handle_collisions(self):
         basket_rect = self._basket.get_rect()
-        for obj in self._star_manager.get_list()[:]:
-            if obj.get_y() > HEIGHT:
-                self._star_manager.remove(obj)
-                if isinstance(obj, Star):
-                    self._missed_stars += 1; self._combo = 0; self._score = max(0, self._score - 5)
-                    event_bus.notify("miss", {"missed": self._missed_stars, "score": self._score})  # OBSERVER
-                    if self._missed_stars >= MAX_MISSED_STARS:
-                        self._game.update_high_score(self._score)
-                        event_bus.notify("game_over", {"score": self._score, "mode": "endless"})  # OBSERVER
-                        self._game.change_state(GameOverState(self._game, self._score)); return
-            elif obj.get_rect().colliderect(basket_rect):
-                if isinstance(obj, Currency): self._game.add_currency(1); self._game.play_catch_sound()
-                elif isinstance(obj, Star):
-                    self._game.play_catch_sound(); self._score += obj.get_points() + self._combo; self._combo += 1
-                    event_bus.notify("score", {"score": self._score, "combo": self._combo})  # OBSERVER
-                    if self._speed_multiplier < 5.0: self._speed_multiplier = min(self._speed_multiplier + 0.03, 5.0)
-                    pos = obj.get_pos(); col = obj.get_color()
-                    for _ in range(random.randint(8, 12)): self._particle_manager.add(Particle(pos[0], pos[1], col))
-                self._star_manager.remove(obj)
+        caught, missed = self._collisions.sweep(self._star_ys, basket_rect)
+        for star in caught:
+            self._game.play_catch_sound(); self._score += star.get_points() + self._combo; self._combo += 1
+            event_bus.notify("score", {"score": self._score, "combo": self._combo})  # OBSERVER
+            if self._speed_multiplier < self.MAX_SPEED_MULTIPLIER: self._speed_multiplier = min(self._speed_multiplier + self.SPEED_STEP, self.MAX_SPEED_MULTIPLIER)
+            pos = star.get_pos(); col = star.get_color()
+            self._particles.emit(pos[0], pos[1], random.randint(8, 12), col)
+            self._star_manager.remove(star)
+        for star in missed:
+            self._star_manager.remove(star)
+            self._missed_stars += 1; self._combo = 0; self._score = max(0, self._score - 5)
+            event_bus.notify("miss", {"missed": self._missed_stars, "score": self._score})  # OBSERVER
+            if self._missed_stars >= MAX_MISSED_STARS:
+                self._game.update_high_score(self._score)
+                event_bus.notify("game_over", {"score": self._score, "mode": "endless"})  # OBSERVER
+                self._game.change_state(GameOverState(self._game, self._score)); return
+        caught, missed = self._collisions.sweep(self._coin_ys, basket_rect)
+        for coin in caught: self._game.add_currency(1); self._game.play_catch_sound(); self._star_manager.remove(coin)
+        for coin in missed: self._star_manager.remove(coin)
     def update(self, dt):
-        self._basket.update(dt, keys=pygame.key.get_pressed(), speed_multiplier=self._speed_multiplier); self._spawn_stars(); self._star_manager.update_all(dt, speed_multiplier=self._speed_multiplier); self._handle_collisions()
-        for particle in self._particle_manager.get_list()[:]:
-            if not particle.update(dt): self._particle_manager.remove(particle)
+        self._basket.update(dt, keys=self._game.get_keys(), speed_multiplier=self._speed_multiplier); self._spawn_stars(dt); self._star_manager.update_all(dt, speed_multiplier=self._speed_multiplier); self._handle_collisions()
+        self._particles.update(dt); self._elapsed += dt; self._autosave_timer += dt
+        if self._autosave_timer >= AUTOSAVE_INTERVAL: self._autosave_timer = 0.0; self._game.autosave_session(self.create_memento())
+    def create_memento(self) -> GameMemento:
+        return GameMemento(score=self._score, combo=self._combo, missed=self._missed_stars, elapsed=self._elapsed, mode="endless",
+                           speed=self._speed_multiplier, basket_x=self._basket.get_x(), entities=_memento_entities(self._star_manager))
     def draw(self, surface):
-        self._basket.draw(surface); self._star_manager.draw_all(surface); self._particle_manager.draw_all(surface); txt_col = theme_mgr.get("text_color")
-        draw_text(surface, f"{loc.get('SCORE')} {self._score}", self._game.FONT_MEDIUM, 60, 20, color=txt_col, align="topleft")
-        draw_text(surface, f"{loc.get('COMBO')} x{self._combo}", self._game.FONT_SMALL, 60, 60, color=txt_col, align="topleft")
-        draw_text(surface, f"{loc.get('MISSED')} {self._missed_stars}/{MAX_MISSED_STARS}", self._game.FONT_SMALL, 60, 100, color=RED_ERROR, align="topleft")
-        draw_text(surface, f"{loc.get('SPEED')} {self._speed_multiplier:.2f}x", self._game.FONT_TINY, WIDTH - 80, 20, color=txt_col, align="topright")
-        draw_text(surface, f"{loc.get('PLATFORM')} {self._basket.get_vel():.1f}", self._game.FONT_TINY, WIDTH - 80, 50, color=txt_col, align="topright")
+        ctx = self._game.get_render_context(); alpha = self._game.get_interpolation_alpha(); txt_col = ctx.text_color
+        rects = [self._basket.draw(surface, ctx, alpha)] + self._star_manager.draw_all(surface, ctx, alpha) + [self._particles.draw(surface)]
+        rects.append(draw_text(surface, f"{loc.get('SCORE')} {self._score}", self._game.FONT_MEDIUM, 60, 20, color=txt_col, align="topleft"))
+        rects.append(draw_text(surface, f"{loc.get('COMBO')} x{self._combo}", self._game.FONT_SMALL, 60, 60, color=txt_col, align="topleft"))
+        rects.append(draw_text(surface, f"{loc.get('MISSED')} {self._missed_stars}/{MAX_MISSED_STARS}", self._game.FONT_SMALL, 60, 100, color=RED_ERROR, align="topleft"))
+        rects.append(draw_text(surface, f"{loc.get('SPEED')} {self._speed_multiplier:.2f}x", self._game.FONT_TINY, WIDTH - 80, 20, color=txt_col, align="topright"))
+        rects.append(draw_text(surface, f"{loc.get('PLATFORM')} {self._basket.get_vel():.1f}", self._game.FONT_TINY, WIDTH - 80, 50, color=txt_col, align="topright"))
+        return rects
 
 class RhythmGameState(GameState):
     def __init__(self, game, song_data):
-        super().__init__(game); self._basket = Basket(game); self._star_manager = ObjectManager[Star](); self._particle_manager = ObjectManager[Particle]()
+        super().__init__(game); self._basket = Basket(game); self._star_manager = ObjectManager[Star](); self._particles = ParticleSystem(); self._collisions = CollisionSweep()
+        self._note_ys = self._star_manager.attach_index(Star, YColumn())
         self._song_data = song_data; self._bpm = song_data["bpm"]; self._beat_interval = 60.0 / self._bpm
         self._next_beat_time = 0; self._timer = 0.0; self._speed = 5.0; self._score = 0; self._is_playing = True
-        self._missed_notes = 0; self._max_missed_notes = 5
+        self._missed_notes = 0; self._max_missed_notes = 5; self._autosave_timer = 0.0
         self._note_sequence = game.notes_data.get(song_data.get("note_id"), []); self._current_note_index = 0
         pygame.mixer.music.stop()
 
@@ -279,27 +297,32 @@ class RhythmGameState(GameState):
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE: pygame.mixer.music.pause(); self._game.change_state(PausedState(self._game, self))
 
     def update(self, dt):
-        self._basket.update(dt, keys=pygame.key.get_pressed(), speed_multiplier=1.2); self._timer += dt
+        self._basket.update(dt, keys=self._game.get_keys(), speed_multiplier=1.2); self._timer += dt
         if self._timer >= self._next_beat_time: self._spawn_rhythm_note(); self._next_beat_time += self._beat_interval * 2
         self._star_manager.update_all(dt, speed_multiplier=1.0, speed=self._speed)
-        basket_rect = self._basket.get_rect()
-        for star in self._star_manager.get_list()[:]:
-            if star.get_y() > HEIGHT:
-                self._missed_notes += 1
-                self._star_manager.remove(star)
-                event_bus.notify("miss", {"missed": self._missed_notes, "mode": "rhythm"})  # OBSERVER
-                if self._missed_notes >= self._max_missed_notes:
-                    self._game.update_high_score(self._score)
-                    event_bus.notify("game_over", {"score": self._score, "mode": "rhythm"})  # OBSERVER
-                    self._game.change_state(GameOverState(self._game, self._score, self._song_data)); return
-            elif star.get_rect().colliderect(basket_rect):
-                if star.get_note_name(): self._game.play_note_sound(star.get_note_name())
-                self._score += 10; pos = star.get_pos(); col = star.get_color()
-                event_bus.notify("score", {"score": self._score, "mode": "rhythm"})  # OBSERVER
-                for _ in range(10): self._particle_manager.add(Particle(pos[0], pos[1], col))
-                self._star_manager.remove(star)
-        for particle in self._particle_manager.get_list()[:]:
-            if not particle.update(dt): self._particle_manager.remove(particle)
+        caught, missed = self._collisions.sweep(self._note_ys, self._basket.get_rect())
+        for star in caught:
+            if star.get_note_name(): self._game.play_note_sound(star.get_note_name())
+            self._score += 10; pos = star.get_pos(); col = star.get_color()
+            event_bus.notify("score", {"score": self._score, "mode": "rhythm"})  # OBSERVER
+            self._particles.emit(pos[0], pos[1], 10, col)
+            self._star_manager.remove(star)
+        for star in missed:
+            self._missed_notes += 1
+            self._star_manager.remove(star)
+            event_bus.notify("miss", {"missed": self._missed_notes, "mode": "rhythm"})  # OBSERVER
+            if self._missed_notes >= self._max_missed_notes:
+                self._game.update_high_score(self._score)
+                event_bus.notify("game_over", {"score": self._score, "mode": "rhythm"})  # OBSERVER
+                self._game.change_state(GameOverState(self._game, self._score, self._song_data)); return
+        self._particles.update(dt); self._autosave_timer += dt
+        if self._autosave_timer >= AUTOSAVE_INTERVAL: self._autosave_timer = 0.0; self._game.autosave_session(self.create_memento())
+
+    def create_memento(self) -> GameMemento:
+        # song_data is shared by reference, never copied
+        return GameMemento(score=self._score, combo=0, missed=self._missed_notes, elapsed=self._timer, mode="rhythm", song_data=self._song_data,
+                           note_index=self._current_note_index, speed=self._speed, basket_x=self._basket.get_x(),
+                           entities=_memento_entities(self._star_manager))
 
     def _spawn_rhythm_note(self):
         note_name = None
@@ -308,6 +331,8 @@ class RhythmGameState(GameState):
         self._star_manager.add(star)
 
     def draw(self, surface):
-        self._basket.draw(surface); self._star_manager.draw_all(surface); self._particle_manager.draw_all(surface)
-        draw_text(surface, f"Score: {self._score}", self._game.FONT_MEDIUM, 60, 20, color=theme_mgr.get("text_color"), align="topleft")
-        draw_text(surface, f"{loc.get('MISSED')} {self._missed_notes}/{self._max_missed_notes}", self._game.FONT_SMALL, 60, 60, color=RED_ERROR, align="topleft")
\ No newline at end of file
+        ctx = self._game.get_render_context(); alpha = self._game.get_interpolation_alpha()
+        rects = [self._basket.draw(surface, ctx, alpha)] + self._star_manager.draw_all(surface, ctx, alpha) + [self._particles.draw(surface)]
+        rects.append(draw_text(surface, f"Score: {self._score}", self._game.FONT_MEDIUM, 60, 20, color=ctx.text_color, align="topleft"))
+        rects.append(draw_text(surface, f"{loc.get('MISSED')} {self._missed_notes}/{self._max_missed_notes}", self._game.FONT_SMALL, 60, 60, color=RED_ERROR, align="topleft"))
+        return rects
\ No newline at end of file